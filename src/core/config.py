@@ -24,8 +24,23 @@ class AppSettings(BaseSettings):
     QDRANT_CLOUD_URL: str = "str"
     QDRANT_DATABASE_HOST: str = "qdrant"
     QDRANT_DATABASE_PORT: int = 6333
+    QDRANT_DATABASE_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_TIMEOUT: int = 10  # In seconds.
+    QDRANT_POOL_SIZE: int = 20  # Max number of HTTP connections kept open to Qdrant.
     USE_QDRANT_CLOUD: bool = False
     QDRANT_APIKEY: str | None = None
+    QDRANT_VECTOR_DATATYPE: str = "float32"  # One of: float32, float16.
+    QDRANT_VECTORS_ON_DISK: bool = False
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    QDRANT_QUANTIZATION: str = "scalar"  # One of: none, scalar, binary.
+    QDRANT_INDEXING_THRESHOLD: int = 20000  # Segment size (in KB) above which the HNSW index is built.
+    QDRANT_SEARCH_HNSW_EF: int = 128
+    QDRANT_SEARCH_RESCORE: bool = True
+    QDRANT_SEARCH_OVERSAMPLING: float = 2.0
+    QDRANT_SPARSE_VECTOR_NAME: str = "text-sparse"
+    QDRANT_HYBRID_PREFETCH_LIMIT: int = 20  # Candidates fetched from each of the dense and sparse indexes.
 
     # OpenAI config
     OPENAI_MODEL_ID: str = "gpt-4o-mini"
@@ -57,6 +72,11 @@ class AppSettings(BaseSettings):
     EMBEDDING_SIZE: int = 384
     EMBEDDING_MODEL_DEVICE: str = "cpu"
 
+    # Sparse (BM25) embeddings config
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    BM25_AVG_DOC_LENGTH: float = 256  # Average number of tokens of a chunk.
+
     def patch_localhost(self) -> None:
         self.MONGO_DATABASE_HOST = "mongodb://localhost:30001,localhost:30002,localhost:30003/?replicaSet=my-replica-set"
         self.QDRANT_DATABASE_HOST = "localhost"
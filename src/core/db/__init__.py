@@ -1,3 +1,3 @@
-from . import documents, mongo, qdrant
+from . import documents, mongo, qdrant, qdrant_schema
 
-__all__ = ["documents", "mongo", "qdrant"]
+__all__ = ["documents", "mongo", "qdrant", "qdrant_schema"]
@@ -5,7 +5,7 @@ from pydantic import UUID4, BaseModel, ConfigDict, Field
 from pymongo import errors
 
 import core.logger_utils as logger_utils
-from core.db.mongo import connection
+from core.db.mongo import AsyncMongoDatabaseConnector, connection
 from core.errors import ImproperlyConfigured
 
 _database = connection.get_database("twin")
@@ -67,6 +67,22 @@ class BaseDocument(BaseModel):
 
             return None
 
+    @classmethod
+    async def aget_or_create(cls, **filter_options) -> Optional[str]:
+        database = AsyncMongoDatabaseConnector().get_database("twin")
+        collection = database[cls._get_collection_name()]
+        try:
+            instance = await collection.find_one(filter_options)
+            if instance:
+                return str(cls.from_mongo(instance).id)
+            new_instance = cls(**filter_options)
+            result = await collection.insert_one(new_instance.to_mongo())
+            return result.inserted_id
+        except (errors.OperationFailure, errors.WriteError):
+            logger.exception("Failed to retrieve or create document.")
+
+            return None
+
     @classmethod
     def find(cls, **filter_options):
         collection = _database[cls._get_collection_name()]
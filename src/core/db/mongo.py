@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
 from pymongo.errors import ConnectionFailure
 
 from core.config import settings
@@ -37,4 +37,17 @@ class MongoDatabaseConnector:
             logger.info("Connected to database has been closed.")
 
 
+class AsyncMongoDatabaseConnector:
+    """Singleton class to connect to MongoDB database from asyncio code."""
+
+    _instance: AsyncMongoClient | None = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            # The client connects lazily, on the first operation awaited from an event loop.
+            cls._instance = AsyncMongoClient(settings.MONGO_DATABASE_HOST)
+
+        return cls._instance
+
+
 connection = MongoDatabaseConnector()
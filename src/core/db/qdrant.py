@@ -1,52 +1,215 @@
-from qdrant_client import QdrantClient, models
-from qdrant_client.http.models import Batch, Distance, VectorParams
+import threading
+
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from qdrant_client.http.models import Batch, Datatype
 
 import core.logger_utils as logger_utils
 from core.config import settings
+from core.db.qdrant_schema import CollectionSchema, get_search_params
 
 logger = logger_utils.get_logger(__name__)
 
 
 class QdrantDatabaseConnector:
+    """
+    Process-wide connection manager for Qdrant.
+    The sync and async clients are created once per process and shared by every connector instance,
+    so the retriever, the sinks and the scripts all reuse the same connection pool.
+    """
+
     _instance: QdrantClient | None = None
+    _async_instance: AsyncQdrantClient | None = None
+    _lock = threading.Lock()
+    _sparse_vector_support: dict[str, bool] = {}
 
     def __init__(self) -> None:
-        if self._instance is None:
-            if settings.USE_QDRANT_CLOUD:
-                self._instance = QdrantClient(
-                    url=settings.QDRANT_CLOUD_URL,
-                    api_key=settings.QDRANT_APIKEY,
-                )
-            else:
-                self._instance = QdrantClient(
-                    host=settings.QDRANT_DATABASE_HOST,
-                    port=settings.QDRANT_DATABASE_PORT,
-                )
+        if QdrantDatabaseConnector._instance is None:
+            with QdrantDatabaseConnector._lock:
+                if QdrantDatabaseConnector._instance is None:
+                    QdrantDatabaseConnector._instance = QdrantClient(
+                        **_get_client_kwargs()
+                    )
+                    logger.info(
+                        "Connection to Qdrant successful.",
+                        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                    )
+
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        if QdrantDatabaseConnector._async_instance is None:
+            with QdrantDatabaseConnector._lock:
+                if QdrantDatabaseConnector._async_instance is None:
+                    QdrantDatabaseConnector._async_instance = AsyncQdrantClient(
+                        **_get_client_kwargs()
+                    )
+
+        return QdrantDatabaseConnector._async_instance
+
+    def health_check(self) -> bool:
+        try:
+            self._instance.get_collections()
+        except Exception:
+            logger.exception("Qdrant health check failed.")
+
+            return False
+
+        return True
 
     def get_collection(self, collection_name: str):
         return self._instance.get_collection(collection_name=collection_name)
 
-    def create_non_vector_collection(self, collection_name: str):
-        self._instance.create_collection(
-            collection_name=collection_name, vectors_config={}
-        )
+    def apply_collection_schema(self, schema: CollectionSchema) -> None:
+        """
+        Create the collection if it doesn't exist, otherwise update its index, quantization and optimizer
+        settings when they drift from the schema. Missing payload indexes are created in both cases.
+        """
 
-    def create_vector_collection(self, collection_name: str):
-        self._instance.create_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=settings.EMBEDDING_SIZE, distance=Distance.COSINE
-            ),
-        )
+        if self._create_collection(schema):
+            indexed_fields = set()
+        else:
+            collection_info = self._instance.get_collection(
+                collection_name=schema.collection_name
+            )
+            if schema.has_vectors and not _matches_schema(collection_info, schema):
+                logger.info(
+                    "Updating collection configuration.",
+                    collection_name=schema.collection_name,
+                )
+                self._instance.update_collection(
+                    collection_name=schema.collection_name,
+                    vectors_config={"": models.VectorParamsDiff(on_disk=schema.on_disk)},
+                    hnsw_config=schema.get_hnsw_config(),
+                    optimizers_config=schema.get_optimizers_config(),
+                    quantization_config=schema.get_quantization_config()
+                    or models.Disabled.DISABLED,
+                )
+            if schema.sparse_vector_name is not None and not _has_sparse_vector(
+                collection_info, schema.sparse_vector_name
+            ):
+                # Sparse vectors can't be added to an existing collection.
+                logger.warning(
+                    "The collection has no sparse vectors, so it is searched with dense vectors only. "
+                    "Recreate it and run a backfill to enable hybrid search.",
+                    collection_name=schema.collection_name,
+                )
+            indexed_fields = set(collection_info.payload_schema.keys())
+
+        for field_name in schema.payload_indexes:
+            if field_name in indexed_fields:
+                continue
+
+            self._instance.create_payload_index(
+                collection_name=schema.collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+                wait=True,
+            )
+            logger.info(
+                "Created payload index.",
+                collection_name=schema.collection_name,
+                field_name=field_name,
+            )
+
+    def _create_collection(self, schema: CollectionSchema) -> bool:
+        """Create the collection if it doesn't exist. Returns whether it was created by this call."""
+
+        if self._instance.collection_exists(collection_name=schema.collection_name):
+            return False
+
+        logger.info("Creating collection.", collection_name=schema.collection_name)
+        try:
+            self._instance.create_collection(
+                collection_name=schema.collection_name,
+                vectors_config=schema.get_vectors_config(),
+                sparse_vectors_config=schema.get_sparse_vectors_config(),
+                hnsw_config=schema.get_hnsw_config(),
+                optimizers_config=schema.get_optimizers_config(),
+                quantization_config=schema.get_quantization_config(),
+            )
+        except Exception:
+            # Every process of the pipeline applies the schemas when it starts, so another one may have
+            # created the collection in the meantime (Qdrant answers with a conflict). It is then updated
+            # like any existing collection.
+            if not self._instance.collection_exists(
+                collection_name=schema.collection_name
+            ):
+                raise
+
+            logger.info(
+                "Collection created by another process.",
+                collection_name=schema.collection_name,
+            )
+
+            return False
+
+        return True
 
-    def write_data(self, collection_name: str, points: Batch):
+    def write_data(self, collection_name: str, points: Batch, wait: bool = True):
         try:
-            self._instance.upsert(collection_name=collection_name, points=points)
+            self._instance.upsert(
+                collection_name=collection_name, points=points, wait=wait
+            )
         except Exception:
             logger.exception("An error occurred while inserting data.")
 
             raise
 
+    def delete_points(self, collection_name: str, point_ids: list, wait: bool = True):
+        try:
+            self._instance.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=point_ids),
+                wait=wait,
+            )
+        except Exception:
+            logger.exception("An error occurred while deleting data.")
+
+            raise
+
+    def delete_orphaned_points(
+        self,
+        collection_name: str,
+        point_ids_by_entry_id: dict[str, list[str]],
+        wait: bool = True,
+    ) -> None:
+        """
+        Delete the points of the documents that are not part of their current version, in a single request.
+        The points are matched on the id payload (the entry_id of their document), so the stale points are
+        found without knowing their ids.
+        """
+
+        if len(point_ids_by_entry_id) == 0:
+            return
+
+        orphans_filter = models.Filter(
+            should=[
+                models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="id", match=models.MatchValue(value=entry_id)
+                        )
+                    ],
+                    # A document without chunks left has all its points deleted.
+                    must_not=[models.HasIdCondition(has_id=point_ids)]
+                    if point_ids
+                    else None,
+                )
+                for entry_id, point_ids in point_ids_by_entry_id.items()
+            ]
+        )
+        try:
+            self._instance.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=orphans_filter),
+                wait=wait,
+            )
+        except Exception:
+            logger.exception("An error occurred while deleting data.")
+
+            raise
+
     def search(
         self,
         collection_name: str,
@@ -56,16 +219,249 @@ class QdrantDatabaseConnector:
     ) -> list:
         return self._instance.search(
             collection_name=collection_name,
-            query_vector=query_vector,
+            query_vector=cast_vectors(np.asarray(query_vector)).tolist(),
             query_filter=query_filter,
             limit=limit,
+            search_params=get_search_params(),
+        )
+
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: list[list],
+        query_filter: models.Filter | None = None,
+        limit: int = 3,
+    ) -> list[list]:
+        """Search a collection for all the query vectors in a single request. Result i holds the hits of query_vectors[i]."""
+
+        return self._instance.search_batch(
+            collection_name=collection_name,
+            requests=_build_search_requests(query_vectors, query_filter, limit),
+        )
+
+    async def asearch_batch(
+        self,
+        collection_name: str,
+        query_vectors: list[list],
+        query_filter: models.Filter | None = None,
+        limit: int = 3,
+    ) -> list[list]:
+        return await self.async_client.search_batch(
+            collection_name=collection_name,
+            requests=_build_search_requests(query_vectors, query_filter, limit),
+        )
+
+    def has_sparse_vectors(self, collection_name: str) -> bool:
+        """Whether the collection holds the sparse vectors used by hybrid search (cached per collection)."""
+
+        if collection_name not in self._sparse_vector_support:
+            collection_info = self._instance.get_collection(
+                collection_name=collection_name
+            )
+            self._sparse_vector_support[collection_name] = _has_sparse_vector(
+                collection_info, settings.QDRANT_SPARSE_VECTOR_NAME
+            )
+
+        return self._sparse_vector_support[collection_name]
+
+    async def ahas_sparse_vectors(self, collection_name: str) -> bool:
+        if collection_name not in self._sparse_vector_support:
+            collection_info = await self.async_client.get_collection(
+                collection_name=collection_name
+            )
+            self._sparse_vector_support[collection_name] = _has_sparse_vector(
+                collection_info, settings.QDRANT_SPARSE_VECTOR_NAME
+            )
+
+        return self._sparse_vector_support[collection_name]
+
+    def hybrid_search_batch(
+        self,
+        collection_name: str,
+        query_vectors: list[list],
+        sparse_query_vectors: list[models.SparseVector],
+        query_filter: models.Filter | None = None,
+        limit: int = 3,
+    ) -> list[list]:
+        """
+        Search a collection with both the dense and the sparse vectors of every query, fusing the two rankings
+        with reciprocal-rank fusion, in a single request. Falls back to a dense search when the collection
+        has no sparse vectors.
+        """
+
+        if not self.has_sparse_vectors(collection_name):
+            return self.search_batch(
+                collection_name=collection_name,
+                query_vectors=query_vectors,
+                query_filter=query_filter,
+                limit=limit,
+            )
+
+        responses = self._instance.query_batch_points(
+            collection_name=collection_name,
+            requests=_build_hybrid_query_requests(
+                query_vectors, sparse_query_vectors, query_filter, limit
+            ),
         )
 
+        return [response.points for response in responses]
+
+    async def ahybrid_search_batch(
+        self,
+        collection_name: str,
+        query_vectors: list[list],
+        sparse_query_vectors: list[models.SparseVector],
+        query_filter: models.Filter | None = None,
+        limit: int = 3,
+    ) -> list[list]:
+        if not await self.ahas_sparse_vectors(collection_name):
+            return await self.asearch_batch(
+                collection_name=collection_name,
+                query_vectors=query_vectors,
+                query_filter=query_filter,
+                limit=limit,
+            )
+
+        responses = await self.async_client.query_batch_points(
+            collection_name=collection_name,
+            requests=_build_hybrid_query_requests(
+                query_vectors, sparse_query_vectors, query_filter, limit
+            ),
+        )
+
+        return [response.points for response in responses]
+
     def scroll(self, collection_name: str, limit: int):
         return self._instance.scroll(collection_name=collection_name, limit=limit)
 
     def close(self):
-        if self._instance:
-            self._instance.close()
+        """Close the shared clients. The next connector instance opens new ones."""
+
+        with QdrantDatabaseConnector._lock:
+            if QdrantDatabaseConnector._instance:
+                QdrantDatabaseConnector._instance.close()
+                QdrantDatabaseConnector._instance = None
+
+                logger.info("Connected to database has been closed.")
+
+            # The async client is closed by its event loop (see aclose).
+            QdrantDatabaseConnector._async_instance = None
+
+    async def aclose(self):
+        if QdrantDatabaseConnector._async_instance:
+            await QdrantDatabaseConnector._async_instance.close()
+            QdrantDatabaseConnector._async_instance = None
+
+
+def _get_client_kwargs() -> dict:
+    pool_limits = httpx.Limits(
+        max_connections=settings.QDRANT_POOL_SIZE,
+        max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+    )
+    client_kwargs = {
+        "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+        "timeout": settings.QDRANT_TIMEOUT,
+        # Forwarded to the underlying httpx client used by the REST API.
+        "limits": pool_limits,
+    }
+    if settings.USE_QDRANT_CLOUD:
+        return {
+            "url": settings.QDRANT_CLOUD_URL,
+            "api_key": settings.QDRANT_APIKEY,
+            **client_kwargs,
+        }
+
+    return {
+        "host": settings.QDRANT_DATABASE_HOST,
+        "port": settings.QDRANT_DATABASE_PORT,
+        "grpc_port": settings.QDRANT_DATABASE_GRPC_PORT,
+        **client_kwargs,
+    }
+
+
+def _build_search_requests(
+    query_vectors: list[list], query_filter: models.Filter | None, limit: int
+) -> list[models.SearchRequest]:
+    search_params = get_search_params()
+
+    return [
+        models.SearchRequest(
+            vector=cast_vectors(np.asarray(query_vector)).tolist(),
+            filter=query_filter,
+            limit=limit,
+            params=search_params,
+            with_payload=True,
+        )
+        for query_vector in query_vectors
+    ]
+
+
+def _build_hybrid_query_requests(
+    query_vectors: list[list],
+    sparse_query_vectors: list[models.SparseVector],
+    query_filter: models.Filter | None,
+    limit: int,
+) -> list[models.QueryRequest]:
+    search_params = get_search_params()
+    prefetch_limit = max(limit, settings.QDRANT_HYBRID_PREFETCH_LIMIT)
+
+    return [
+        models.QueryRequest(
+            prefetch=[
+                models.Prefetch(
+                    query=cast_vectors(np.asarray(query_vector)).tolist(),
+                    filter=query_filter,
+                    params=search_params,
+                    limit=prefetch_limit,
+                ),
+                models.Prefetch(
+                    query=sparse_query_vector,
+                    using=settings.QDRANT_SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            filter=query_filter,
+            limit=limit,
+            with_payload=True,
+        )
+        for query_vector, sparse_query_vector in zip(query_vectors, sparse_query_vectors)
+    ]
+
+
+def _has_sparse_vector(
+    collection_info: models.CollectionInfo, sparse_vector_name: str
+) -> bool:
+    sparse_vectors = collection_info.config.params.sparse_vectors or {}
+
+    return sparse_vector_name in sparse_vectors
+
+
+def _matches_schema(collection_info: models.CollectionInfo, schema: CollectionSchema) -> bool:
+    config = collection_info.config
+    quantization_config = schema.get_quantization_config()
+
+    return (
+        # Collections created by older Qdrant versions report on_disk as None, which means in memory.
+        bool(config.params.vectors.on_disk) == schema.on_disk
+        and config.hnsw_config.m == schema.hnsw_m
+        and config.hnsw_config.ef_construct == schema.hnsw_ef_construct
+        and config.optimizer_config.indexing_threshold == schema.indexing_threshold
+        and type(config.quantization_config) is type(quantization_config)
+    )
+
+
+def cast_vectors(vectors: np.ndarray, datatype: str | None = None) -> np.ndarray:
+    """
+    Convert embeddings to the datatype the vector collections are configured with, so the query vectors
+    go through the same conversion as the stored ones.
+    """
 
-            logger.info("Connected to database has been closed.")
+    datatype = datatype or settings.QDRANT_VECTOR_DATATYPE
+    if datatype == Datatype.FLOAT32:
+        return vectors.astype(np.float32, copy=False)
+    elif datatype == Datatype.FLOAT16:
+        return vectors.astype(np.float16)
+    else:
+        raise ValueError(f"Unsupported vector datatype: {datatype}")
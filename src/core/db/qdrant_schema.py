@@ -0,0 +1,124 @@
+from typing import Literal
+
+from pydantic import BaseModel
+from qdrant_client import models
+
+from core.config import settings
+
+
+class CollectionSchema(BaseModel):
+    """
+    Declarative description of a Qdrant collection.
+    Collections without vectors only hold payloads (e.g. the cleaned documents).
+    """
+
+    collection_name: str
+    has_vectors: bool = True
+    sparse_vector_name: str | None = None
+    payload_indexes: list[str] = []
+
+    vector_size: int = settings.EMBEDDING_SIZE
+    distance: models.Distance = models.Distance.COSINE
+    # Compressing the vectors further is done with quantization (QDRANT_QUANTIZATION), which rescores the
+    # candidates with the original vectors.
+    datatype: Literal["float32", "float16"] = settings.QDRANT_VECTOR_DATATYPE
+    on_disk: bool = settings.QDRANT_VECTORS_ON_DISK
+    hnsw_m: int = settings.QDRANT_HNSW_M
+    hnsw_ef_construct: int = settings.QDRANT_HNSW_EF_CONSTRUCT
+    quantization: Literal["none", "scalar", "binary"] = settings.QDRANT_QUANTIZATION
+    quantization_always_ram: bool = True
+    indexing_threshold: int = settings.QDRANT_INDEXING_THRESHOLD
+
+    def get_vectors_config(self) -> models.VectorParams | dict:
+        if not self.has_vectors:
+            return {}
+
+        return models.VectorParams(
+            size=self.vector_size,
+            distance=self.distance,
+            datatype=models.Datatype(self.datatype),
+            on_disk=self.on_disk,
+        )
+
+    def get_sparse_vectors_config(self) -> dict[str, models.SparseVectorParams] | None:
+        if self.sparse_vector_name is None:
+            return None
+
+        # Qdrant weights the terms of the queries by their IDF, computed over the whole collection.
+        return {
+            self.sparse_vector_name: models.SparseVectorParams(
+                modifier=models.Modifier.IDF
+            )
+        }
+
+    def get_hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def get_optimizers_config(self) -> models.OptimizersConfigDiff:
+        return models.OptimizersConfigDiff(indexing_threshold=self.indexing_threshold)
+
+    def get_quantization_config(self) -> models.QuantizationConfig | None:
+        if not self.has_vectors:
+            return None
+
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.quantization_always_ram,
+                )
+            )
+        elif self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(
+                    always_ram=self.quantization_always_ram
+                )
+            )
+
+        return None
+
+
+COLLECTION_SCHEMAS = [
+    CollectionSchema(collection_name="cleaned_posts", has_vectors=False),
+    CollectionSchema(collection_name="cleaned_articles", has_vectors=False),
+    CollectionSchema(collection_name="cleaned_repositories", has_vectors=False),
+    CollectionSchema(
+        collection_name="vector_posts",
+        sparse_vector_name=settings.QDRANT_SPARSE_VECTOR_NAME,
+        payload_indexes=["id", "author_id"],
+    ),
+    CollectionSchema(
+        collection_name="vector_articles",
+        sparse_vector_name=settings.QDRANT_SPARSE_VECTOR_NAME,
+        payload_indexes=["id", "author_id"],
+    ),
+    CollectionSchema(
+        collection_name="vector_repositories",
+        sparse_vector_name=settings.QDRANT_SPARSE_VECTOR_NAME,
+        payload_indexes=["id", "owner_id"],
+    ),
+]
+
+
+def get_collection_schema(collection_name: str) -> CollectionSchema:
+    for schema in COLLECTION_SCHEMAS:
+        if schema.collection_name == collection_name:
+            return schema
+
+    raise ValueError(f"Unsupported collection: {collection_name}")
+
+
+def get_search_params() -> models.SearchParams:
+    """Search the quantized vectors first, then rescore the oversampled candidates with the original vectors."""
+
+    quantization = None
+    if settings.QDRANT_QUANTIZATION != "none":
+        quantization = models.QuantizationSearchParams(
+            rescore=settings.QDRANT_SEARCH_RESCORE,
+            oversampling=settings.QDRANT_SEARCH_OVERSAMPLING,
+        )
+
+    return models.SearchParams(
+        hnsw_ef=settings.QDRANT_SEARCH_HNSW_EF, quantization=quantization
+    )
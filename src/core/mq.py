@@ -1,5 +1,3 @@
-from typing import Self
-
 import pika
 from config import settings
 
@@ -9,15 +7,10 @@ logger = get_logger(__file__)
 
 
 class RabbitMQConnection:
-    """Singleton class to manage RabbitMQ connection."""
-
-    _instance = None
-
-    def __new__(cls, *args, **kwargs) -> Self:
-        if not cls._instance:
-            cls._instance = super().__new__(cls, *args, **kwargs)
-
-        return cls._instance
+    """
+    Class to manage a RabbitMQ connection.
+    pika's BlockingConnection is not thread-safe, so every consumer (e.g., each Bytewax input partition) opens its own.
+    """
 
     def __init__(
         self,
@@ -67,6 +60,9 @@ class RabbitMQConnection:
         if self.is_connected():
             return self._connection.channel()
 
+    def process_data_events(self, time_limit: float | None = 0) -> None:
+        self._connection.process_data_events(time_limit=time_limit)
+
     def close(self):
         if self.is_connected():
             self._connection.close()
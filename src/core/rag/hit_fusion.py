@@ -0,0 +1,52 @@
+import hashlib
+
+from config import settings
+
+
+def fuse_hits(
+    ranked_hits: list[list],
+    method: str | None = None,
+    max_candidates: int | None = None,
+    rrf_k: int | None = None,
+) -> list:
+    """
+    Merge the ranked hit lists of several (query, collection) searches into a single list without duplicates.
+
+    Hits are deduplicated on the hash of their content, which also catches the same chunk stored under
+    different point ids. Their scores are fused with reciprocal-rank fusion ("rrf") or by keeping the best
+    score ("max"). The merged hits are sorted by their fused score and capped to max_candidates.
+    """
+
+    method = method or settings.RAG_FUSION_METHOD
+    max_candidates = max_candidates or settings.RAG_MAX_RERANK_CANDIDATES
+    rrf_k = rrf_k or settings.RAG_RRF_K
+
+    fused_hits = {}
+    fused_scores: dict[str, float] = {}
+    for hits in ranked_hits:
+        for rank, hit in enumerate(hits):
+            key = _get_hit_key(hit)
+            if method == "rrf":
+                score = fused_scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            elif method == "max":
+                score = max(fused_scores.get(key, hit.score), hit.score)
+            else:
+                raise ValueError(f"Unsupported fusion method: {method}")
+
+            fused_scores[key] = score
+            fused_hits.setdefault(key, hit)
+
+    candidates = sorted(fused_scores, key=fused_scores.get, reverse=True)[:max_candidates]
+
+    return [
+        fused_hits[key].model_copy(update={"score": fused_scores[key]})
+        for key in candidates
+    ]
+
+
+def _get_hit_key(hit) -> str:
+    content = (hit.payload or {}).get("content")
+    if content is None:
+        return str(hit.id)
+
+    return hashlib.md5(content.encode()).hexdigest()
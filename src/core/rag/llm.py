@@ -0,0 +1,23 @@
+from functools import lru_cache
+
+from config import settings
+from langchain_openai import ChatOpenAI
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(temperature: float | None = None) -> ChatOpenAI:
+    """
+    Return the chat model shared by all the RAG steps of the process.
+    ChatOpenAI is safe to share between threads, so the underlying HTTP connections are reused across requests.
+    """
+
+    if temperature is None:
+        return ChatOpenAI(
+            model=settings.OPENAI_MODEL_ID, api_key=settings.OPENAI_API_KEY
+        )
+
+    return ChatOpenAI(
+        model=settings.OPENAI_MODEL_ID,
+        api_key=settings.OPENAI_API_KEY,
+        temperature=temperature,
+    )
@@ -1,9 +1,10 @@
 import opik
 from config import settings
-from langchain_openai import ChatOpenAI
 from opik.integrations.langchain import OpikTracer
 
+from core.rag.llm import get_chat_model
 from core.rag.prompt_templates import QueryExpansionTemplate
+from core.rag.response_cache import build_cache_key, get_response_cache
 
 
 class QueryExpansion:
@@ -13,19 +14,58 @@ class QueryExpansion:
     @opik.track(name="QueryExpansion.generate_response")
     def generate_response(query: str, to_expand_to_n: int) -> list[str]:
         query_expansion_template = QueryExpansionTemplate()
-        prompt = query_expansion_template.create_template(to_expand_to_n)
-        model = ChatOpenAI(
-            model=settings.OPENAI_MODEL_ID,
-            api_key=settings.OPENAI_API_KEY,
-            temperature=0,
+        cache = get_response_cache()
+        cache_key = build_cache_key(
+            query_expansion_template, settings.OPENAI_MODEL_ID, query, to_expand_to_n
+        )
+
+        response = cache.get(cache_key) if cache else None
+        if response is None:
+            chain = QueryExpansion._build_chain(
+                query_expansion_template, to_expand_to_n
+            )
+            response = chain.invoke({"question": query}).content
+            if cache:
+                cache.set(cache_key, response)
+
+        return QueryExpansion._parse_response(
+            response, query_expansion_template.separator
+        )
+
+    @staticmethod
+    @opik.track(name="QueryExpansion.agenerate_response")
+    async def agenerate_response(query: str, to_expand_to_n: int) -> list[str]:
+        query_expansion_template = QueryExpansionTemplate()
+        cache = get_response_cache()
+        cache_key = build_cache_key(
+            query_expansion_template, settings.OPENAI_MODEL_ID, query, to_expand_to_n
         )
-        chain = prompt | model
-        chain = chain.with_config({"callbacks": [QueryExpansion.opik_tracer]})
 
-        response = chain.invoke({"question": query})
-        response = response.content
+        response = cache.get(cache_key) if cache else None
+        if response is None:
+            chain = QueryExpansion._build_chain(
+                query_expansion_template, to_expand_to_n
+            )
+            response = (await chain.ainvoke({"question": query})).content
+            if cache:
+                cache.set(cache_key, response)
 
-        queries = response.strip().split(query_expansion_template.separator)
+        return QueryExpansion._parse_response(
+            response, query_expansion_template.separator
+        )
+
+    @staticmethod
+    def _build_chain(
+        query_expansion_template: QueryExpansionTemplate, to_expand_to_n: int
+    ):
+        prompt = query_expansion_template.create_template(to_expand_to_n)
+        chain = prompt | get_chat_model(temperature=0)
+
+        return chain.with_config({"callbacks": [QueryExpansion.opik_tracer]})
+
+    @staticmethod
+    def _parse_response(response: str, separator: str) -> list[str]:
+        queries = response.strip().split(separator)
         stripped_queries = [
             stripped_item for item in queries if (stripped_item := item.strip(" \\n"))
         ]
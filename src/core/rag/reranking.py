@@ -1,6 +1,10 @@
+import asyncio
+import threading
+
 from config import settings
-from langchain_openai import ChatOpenAI
+from sentence_transformers.cross_encoder import CrossEncoder
 
+from core.rag.llm import get_chat_model
 from core.rag.prompt_templates import RerankingTemplate
 
 
@@ -10,19 +14,53 @@ class Reranker:
         query: str, passages: list[str], keep_top_k: int
     ) -> list[str]:
         reranking_template = RerankingTemplate()
-        prompt = reranking_template.create_template(keep_top_k=keep_top_k)
-        model = ChatOpenAI(
-            model=settings.OPENAI_MODEL_ID, api_key=settings.OPENAI_API_KEY
+        chain = Reranker._build_chain(reranking_template, keep_top_k)
+
+        response = chain.invoke(
+            {
+                "question": query,
+                "passages": Reranker._join_passages(passages, reranking_template),
+            }
+        )
+
+        return Reranker._parse_response(response.content, reranking_template)
+
+    @staticmethod
+    async def agenerate_response(
+        query: str, passages: list[str], keep_top_k: int
+    ) -> list[str]:
+        reranking_template = RerankingTemplate()
+        chain = Reranker._build_chain(reranking_template, keep_top_k)
+
+        response = await chain.ainvoke(
+            {
+                "question": query,
+                "passages": Reranker._join_passages(passages, reranking_template),
+            }
         )
-        chain = prompt | model
 
+        return Reranker._parse_response(response.content, reranking_template)
+
+    @staticmethod
+    def _build_chain(reranking_template: RerankingTemplate, keep_top_k: int):
+        prompt = reranking_template.create_template(keep_top_k=keep_top_k)
+
+        return prompt | get_chat_model()
+
+    @staticmethod
+    def _join_passages(
+        passages: list[str], reranking_template: RerankingTemplate
+    ) -> str:
         stripped_passages = [
             stripped_item for item in passages if (stripped_item := item.strip())
         ]
-        passages = reranking_template.separator.join(stripped_passages)
-        response = chain.invoke({"question": query, "passages": passages})
-        response = response.content
 
+        return reranking_template.separator.join(stripped_passages)
+
+    @staticmethod
+    def _parse_response(
+        response: str, reranking_template: RerankingTemplate
+    ) -> list[str]:
         reranked_passages = response.strip().split(reranking_template.separator)
         stripped_passages = [
             stripped_item
@@ -31,3 +69,45 @@ class Reranker:
         ]
 
         return stripped_passages
+
+
+class CrossEncoderReranker:
+    """
+    Reranks the retrieved hits locally by scoring every (query, passage) pair with a cross-encoder.
+    The hits are returned with their score replaced by the cross-encoder score, best first.
+    The model is loaded once per process and shared by all the rerankers.
+    """
+
+    _model: CrossEncoder | None = None
+    _model_lock = threading.Lock()
+
+    @classmethod
+    def get_model(cls) -> CrossEncoder:
+        if CrossEncoderReranker._model is None:
+            with cls._model_lock:
+                if CrossEncoderReranker._model is None:
+                    CrossEncoderReranker._model = CrossEncoder(
+                        settings.RERANKER_CROSS_ENCODER_MODEL_ID,
+                        device=settings.EMBEDDING_MODEL_DEVICE,
+                    )
+
+        return CrossEncoderReranker._model
+
+    def rerank_hits(self, query: str, hits: list, keep_top_k: int) -> list:
+        if len(hits) == 0:
+            return []
+
+        scores = self.get_model().predict(
+            [(query, hit.payload["content"]) for hit in hits],
+            batch_size=settings.RERANKER_BATCH_SIZE,
+        )
+        scored_hits = [
+            hit.model_copy(update={"score": float(score)})
+            for hit, score in zip(hits, scores)
+        ]
+        scored_hits.sort(key=lambda hit: hit.score, reverse=True)
+
+        return scored_hits[:keep_top_k]
+
+    async def arerank_hits(self, query: str, hits: list, keep_top_k: int) -> list:
+        return await asyncio.to_thread(self.rerank_hits, query, hits, keep_top_k)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+from config import settings
+
+import core.logger_utils as logger_utils
+from core.rag.prompt_templates import BasePromptTemplate
+
+logger = logger_utils.get_logger(__name__)
+
+
+class ResponseCache(ABC):
+    """
+    Abstract class for all the caches of deterministic LLM responses (e.g. query expansion, self-query).
+    Entries expire ttl_seconds after they were written.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, response: str) -> None:
+        pass
+
+
+class InMemoryResponseCache(ResponseCache):
+    """Least-recently-used cache holding at most max_entries responses."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        super().__init__(ttl_seconds=ttl_seconds)
+
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Disk-backed cache, shared by all the processes using the same file."""
+
+    def __init__(self, path: str, ttl_seconds: int) -> None:
+        super().__init__(ttl_seconds=ttl_seconds)
+
+        self.path = path
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+
+                return None
+
+            self.hits += 1
+
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, now + self.ttl_seconds),
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE expires_at < ?", (now,)
+            )
+            self._connection.commit()
+
+
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Return the response cache of the process, built from RAG_RESPONSE_CACHE_BACKEND (None if it is disabled)."""
+
+    global _response_cache
+
+    if settings.RAG_RESPONSE_CACHE_BACKEND == "none":
+        return None
+
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                if settings.RAG_RESPONSE_CACHE_BACKEND == "memory":
+                    _response_cache = InMemoryResponseCache(
+                        max_entries=settings.RAG_RESPONSE_CACHE_MAX_ENTRIES,
+                        ttl_seconds=settings.RAG_RESPONSE_CACHE_TTL_SECONDS,
+                    )
+                elif settings.RAG_RESPONSE_CACHE_BACKEND == "disk":
+                    _response_cache = SQLiteResponseCache(
+                        path=settings.RAG_RESPONSE_CACHE_PATH,
+                        ttl_seconds=settings.RAG_RESPONSE_CACHE_TTL_SECONDS,
+                    )
+                else:
+                    raise ValueError(
+                        f"Unsupported response cache backend: {settings.RAG_RESPONSE_CACHE_BACKEND}"
+                    )
+
+    return _response_cache
+
+
+def build_cache_key(
+    template: BasePromptTemplate, model_id: str, query: str, n: int | None = None
+) -> str:
+    """
+    Key a response on the template it was generated with, so that editing a prompt invalidates
+    the responses cached for its previous version.
+    """
+
+    template_version = hashlib.md5(
+        template.model_dump_json().encode()
+    ).hexdigest()
+    key = json.dumps(
+        [type(template).__name__, template_version, model_id, query, n]
+    )
+
+    return hashlib.sha256(key.encode()).hexdigest()
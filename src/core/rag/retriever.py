@@ -1,4 +1,6 @@
+import asyncio
 import concurrent.futures
+import threading
 
 import opik
 from config import settings
@@ -6,100 +8,192 @@ from qdrant_client import models
 from sentence_transformers.SentenceTransformer import SentenceTransformer
 
 import core.logger_utils as logger_utils
-from core import lib
 from core.db.qdrant import QdrantDatabaseConnector
+from core.rag.hit_fusion import fuse_hits
 from core.rag.query_expanison import QueryExpansion
-from core.rag.reranking import Reranker
+from core.rag.reranking import CrossEncoderReranker, Reranker
 from core.rag.self_query import SelfQuery
+from core.sparse_embeddings import BM25SparseEncoder
 
 logger = logger_utils.get_logger(__name__)
 
+# The dense vectors of a batch of queries, with their sparse vectors when hybrid search is enabled.
+QueryEmbeddings = tuple[list[list], list[models.SparseVector] | None]
+
+# The field holding the author of the documents of every vector collection.
+COLLECTION_AUTHOR_FIELDS = {
+    "vector_posts": "author_id",
+    "vector_articles": "author_id",
+    "vector_repositories": "owner_id",
+}
+
 
 class VectorRetriever:
     """
     Class for retrieving vectors from a Vector store in a RAG system using query expansion and Multitenancy search.
+
+    The retriever is meant to be built once and reused across requests: the query is passed on every call
+    and no per-request state is kept on the instance, so it can be shared by concurrent sessions.
+    The embedding model is loaded once per process and shared by all the retrievers.
     """
 
-    def __init__(self, query: str) -> None:
+    _shared_embedder: SentenceTransformer | None = None
+    _embedder_lock = threading.Lock()
+
+    def __init__(self) -> None:
         self._client = QdrantDatabaseConnector()
-        self.query = query
-        self._embedder = SentenceTransformer(settings.EMBEDDING_MODEL_ID)
+        self._embedder = self.get_embedder()
         self._query_expander = QueryExpansion()
         self._metadata_extractor = SelfQuery()
-        self._reranker = Reranker()
+        if settings.RERANKER_BACKEND == "openai":
+            self._reranker = Reranker()
+        elif settings.RERANKER_BACKEND == "cross_encoder":
+            self._reranker = CrossEncoderReranker()
+        else:
+            raise ValueError(f"Unsupported reranker backend: {settings.RERANKER_BACKEND}")
+
+    @classmethod
+    def get_embedder(cls) -> SentenceTransformer:
+        if VectorRetriever._shared_embedder is None:
+            with cls._embedder_lock:
+                if VectorRetriever._shared_embedder is None:
+                    VectorRetriever._shared_embedder = SentenceTransformer(
+                        settings.EMBEDDING_MODEL_ID,
+                        device=settings.EMBEDDING_MODEL_DEVICE,
+                    )
+
+        return VectorRetriever._shared_embedder
+
+    def _search_queries(
+        self, query_embeddings: QueryEmbeddings, author_id: str | None, k: int
+    ) -> list[list]:
+        """
+        Search every collection for all the queries at once, with a single batch request per collection.
+        The requests to the three collections are sent concurrently.
+        Returns one ranked list of hits per (collection, query) pair.
+        """
 
-    def _search_single_query(self, generated_query: str, author_id: str, k: int):
         assert k > 3, "k should be greater than 3"
 
-        query_vector = self._embedder.encode(generated_query).tolist()
-
-        vectors = [
-            self._client.search(
-                collection_name="vector_posts",
-                query_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="author_id",
-                            match=models.MatchValue(
-                                value=author_id,
-                            ),
-                        )
-                    ]
-                    if author_id
-                    else None
-                ),
-                query_vector=query_vector,
-                limit=k // 3,
-            ),
-            self._client.search(
-                collection_name="vector_articles",
-                query_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="author_id",
-                            match=models.MatchValue(
-                                value=author_id,
-                            ),
-                        )
-                    ]
-                    if author_id
-                    else None
-                ),
-                query_vector=query_vector,
-                limit=k // 3,
-            ),
-            self._client.search(
-                collection_name="vector_repositories",
-                query_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="owner_id",
-                            match=models.MatchValue(
-                                value=author_id,
-                            ),
-                        )
-                    ]
-                    if author_id
-                    else None
-                ),
-                query_vector=query_vector,
-                limit=k // 3,
-            ),
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(COLLECTION_AUTHOR_FIELDS)
+        ) as executor:
+            search_tasks = [
+                executor.submit(
+                    self._search_collection,
+                    collection_name,
+                    query_embeddings,
+                    self._get_author_filter(author_field, author_id),
+                    k // 3,
+                )
+                for collection_name, author_field in COLLECTION_AUTHOR_FIELDS.items()
+            ]
+            hits_per_collection = [task.result() for task in search_tasks]
+
+        return self._split_ranked_hits(hits_per_collection)
+
+    async def _asearch_queries(
+        self, query_embeddings: QueryEmbeddings, author_id: str | None, k: int
+    ) -> list[list]:
+        assert k > 3, "k should be greater than 3"
+
+        dense_vectors, sparse_vectors = query_embeddings
+        search_tasks = []
+        for collection_name, author_field in COLLECTION_AUTHOR_FIELDS.items():
+            query_filter = self._get_author_filter(author_field, author_id)
+            if sparse_vectors is None:
+                search_tasks.append(
+                    self._client.asearch_batch(
+                        collection_name=collection_name,
+                        query_vectors=dense_vectors,
+                        query_filter=query_filter,
+                        limit=k // 3,
+                    )
+                )
+            else:
+                search_tasks.append(
+                    self._client.ahybrid_search_batch(
+                        collection_name=collection_name,
+                        query_vectors=dense_vectors,
+                        sparse_query_vectors=sparse_vectors,
+                        query_filter=query_filter,
+                        limit=k // 3,
+                    )
+                )
+        hits_per_collection = await asyncio.gather(*search_tasks)
+
+        return self._split_ranked_hits(hits_per_collection)
+
+    def _search_collection(
+        self,
+        collection_name: str,
+        query_embeddings: QueryEmbeddings,
+        query_filter: models.Filter | None,
+        limit: int,
+    ) -> list[list]:
+        dense_vectors, sparse_vectors = query_embeddings
+        if sparse_vectors is None:
+            return self._client.search_batch(
+                collection_name=collection_name,
+                query_vectors=dense_vectors,
+                query_filter=query_filter,
+                limit=limit,
+            )
+
+        return self._client.hybrid_search_batch(
+            collection_name=collection_name,
+            query_vectors=dense_vectors,
+            sparse_query_vectors=sparse_vectors,
+            query_filter=query_filter,
+            limit=limit,
+        )
+
+    @staticmethod
+    def _split_ranked_hits(hits_per_collection: list[list[list]]) -> list[list]:
+        # Each batch holds one ranked list of hits per query.
+        return [
+            query_hits
+            for collection_hits in hits_per_collection
+            for query_hits in collection_hits
         ]
 
-        return lib.flatten(vectors)
+    @staticmethod
+    def _get_author_filter(
+        author_field: str, author_id: str | None
+    ) -> models.Filter | None:
+        if not author_id:
+            return None
 
-    @opik.track(name="retriever.retrieve_top_k")
-    def retrieve_top_k(self, k: int, to_expand_to_n_queries: int) -> list:
-        generated_queries = self._query_expander.generate_response(
-            self.query, to_expand_to_n=to_expand_to_n_queries
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key=author_field,
+                    match=models.MatchValue(
+                        value=author_id,
+                    ),
+                )
+            ]
         )
+
+    def _embed_queries(self, queries: list[str]) -> QueryEmbeddings:
+        # Embed all the queries in a single forward pass.
+        # Only the searches are I/O bound, so they are the only part that runs concurrently.
+        queries = list(dict.fromkeys(queries))
+        dense_vectors = self._embedder.encode(queries, batch_size=len(queries)).tolist()
+
+        sparse_vectors = None
+        if settings.RAG_HYBRID_SEARCH:
+            sparse_vectors = BM25SparseEncoder.get_instance().encode_queries(queries)
+
+        return dense_vectors, sparse_vectors
+
+    @staticmethod
+    def _log_query_analysis(generated_queries: list[str], author_id: str | None) -> None:
         logger.info(
             "Successfully generated queries for search.",
             num_queries=len(generated_queries),
         )
 
-        author_id = self._metadata_extractor.generate_response(self.query)
         if author_id:
             logger.info(
                 "Successfully extracted the author_id from the query.",
@@ -108,31 +202,111 @@ class VectorRetriever:
         else:
             logger.warning("Did not found any author data in the user's prompt.")
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            search_tasks = [
-                executor.submit(self._search_single_query, query, author_id, k)
-                for query in generated_queries
-            ]
+    @staticmethod
+    def _fuse_hits(ranked_hits: list[list]) -> list:
+        hits = fuse_hits(ranked_hits)
 
-            hits = [
-                task.result() for task in concurrent.futures.as_completed(search_tasks)
-            ]
-            hits = lib.flatten(hits)
+        logger.info(
+            "All documents retrieved successfully.",
+            num_retrieved=sum(len(query_hits) for query_hits in ranked_hits),
+            num_documents=len(hits),
+        )
 
-        logger.info("All documents retrieved successfully.", num_documents=len(hits))
+        return hits
+
+    @opik.track(name="retriever.retrieve_top_k")
+    def retrieve_top_k(self, query: str, k: int, to_expand_to_n_queries: int) -> list:
+        """
+        The query expansion and the self-query LLM calls run concurrently. Once both are done, the original
+        and expanded queries are embedded in a single pass and searched.
+        """
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            expansion_task = executor.submit(
+                self._query_expander.generate_response,
+                query,
+                to_expand_to_n=to_expand_to_n_queries,
+            )
+            author_task = executor.submit(
+                self._metadata_extractor.generate_response, query
+            )
+
+            generated_queries = expansion_task.result()
+            author_id = author_task.result()
+        self._log_query_analysis(generated_queries, author_id)
+
+        query_embeddings = self._embed_queries([query, *generated_queries])
+        ranked_hits = self._search_queries(query_embeddings, author_id, k)
+
+        hits = self._fuse_hits(ranked_hits)
 
         return hits
 
-    @opik.track(name="retriever.rerank")
-    def rerank(self, hits: list, keep_top_k: int) -> list[str]:
-        content_list = [hit.payload["content"] for hit in hits]
-        rerank_hits = self._reranker.generate_response(
-            query=self.query, passages=content_list, keep_top_k=keep_top_k
+    @opik.track(name="retriever.aretrieve_top_k")
+    async def aretrieve_top_k(
+        self, query: str, k: int, to_expand_to_n_queries: int
+    ) -> list:
+        """Async counterpart of retrieve_top_k. The CPU-bound query embedding runs in a worker thread."""
+
+        generated_queries, author_id = await asyncio.gather(
+            self._query_expander.agenerate_response(
+                query, to_expand_to_n=to_expand_to_n_queries
+            ),
+            self._metadata_extractor.agenerate_response(query),
+        )
+        self._log_query_analysis(generated_queries, author_id)
+
+        query_embeddings = await asyncio.to_thread(
+            self._embed_queries, [query, *generated_queries]
         )
+        ranked_hits = await self._asearch_queries(query_embeddings, author_id, k)
+
+        hits = self._fuse_hits(ranked_hits)
+
+        return hits
+
+    @opik.track(name="retriever.rerank")
+    def rerank(self, query: str, hits: list, keep_top_k: int) -> list[str]:
+        if isinstance(self._reranker, CrossEncoderReranker):
+            rerank_hits = [
+                hit.payload["content"]
+                for hit in self.rerank_hits(query=query, hits=hits, keep_top_k=keep_top_k)
+            ]
+        else:
+            content_list = [hit.payload["content"] for hit in hits]
+            rerank_hits = self._reranker.generate_response(
+                query=query, passages=content_list, keep_top_k=keep_top_k
+            )
+
+        logger.info("Documents reranked successfully.", num_documents=len(rerank_hits))
+
+        return rerank_hits
+
+    @opik.track(name="retriever.arerank")
+    async def arerank(self, query: str, hits: list, keep_top_k: int) -> list[str]:
+        if isinstance(self._reranker, CrossEncoderReranker):
+            rerank_hits = [
+                hit.payload["content"]
+                for hit in await self._reranker.arerank_hits(
+                    query=query, hits=hits, keep_top_k=keep_top_k
+                )
+            ]
+        else:
+            content_list = [hit.payload["content"] for hit in hits]
+            rerank_hits = await self._reranker.agenerate_response(
+                query=query, passages=content_list, keep_top_k=keep_top_k
+            )
 
         logger.info("Documents reranked successfully.", num_documents=len(rerank_hits))
 
         return rerank_hits
 
-    def set_query(self, query: str):
-        self.query = query
+    def rerank_hits(self, query: str, hits: list, keep_top_k: int) -> list:
+        """Rerank the hits with the cross-encoder backend, returning the hits scored by it (best first)."""
+
+        if not isinstance(self._reranker, CrossEncoderReranker):
+            raise ValueError(
+                "Scored hits are only available with the 'cross_encoder' reranker backend."
+            )
+
+        return self._reranker.rerank_hits(query=query, hits=hits, keep_top_k=keep_top_k)
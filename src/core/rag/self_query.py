@@ -1,12 +1,13 @@
 import opik
 from config import settings
-from langchain_openai import ChatOpenAI
 from opik.integrations.langchain import OpikTracer
 
 import core.logger_utils as logger_utils
 from core import lib
 from core.db.documents import UserDocument
+from core.rag.llm import get_chat_model
 from core.rag.prompt_templates import SelfQueryTemplate
+from core.rag.response_cache import build_cache_key, get_response_cache
 
 logger = logger_utils.get_logger(__name__)
 
@@ -17,17 +18,60 @@ class SelfQuery:
     @staticmethod
     @opik.track(name="SelQuery.generate_response")
     def generate_response(query: str) -> str | None:
-        prompt = SelfQueryTemplate().create_template()
-        model = ChatOpenAI(
-            model=settings.OPENAI_MODEL_ID,
-            api_key=settings.OPENAI_API_KEY,
-            temperature=0,
+        self_query_template = SelfQueryTemplate()
+        cache = get_response_cache()
+        cache_key = build_cache_key(self_query_template, settings.OPENAI_MODEL_ID, query)
+
+        response = cache.get(cache_key) if cache else None
+        if response is None:
+            chain = SelfQuery._build_chain(self_query_template)
+            response = chain.invoke({"question": query}).content
+            if cache:
+                cache.set(cache_key, response)
+
+        user_name = SelfQuery._parse_response(response)
+        if user_name is None:
+            return None
+
+        first_name, last_name = user_name
+        user_id = UserDocument.get_or_create(first_name=first_name, last_name=last_name)
+
+        return user_id
+
+    @staticmethod
+    @opik.track(name="SelQuery.agenerate_response")
+    async def agenerate_response(query: str) -> str | None:
+        self_query_template = SelfQueryTemplate()
+        cache = get_response_cache()
+        cache_key = build_cache_key(self_query_template, settings.OPENAI_MODEL_ID, query)
+
+        response = cache.get(cache_key) if cache else None
+        if response is None:
+            chain = SelfQuery._build_chain(self_query_template)
+            response = (await chain.ainvoke({"question": query})).content
+            if cache:
+                cache.set(cache_key, response)
+
+        user_name = SelfQuery._parse_response(response)
+        if user_name is None:
+            return None
+
+        first_name, last_name = user_name
+        user_id = await UserDocument.aget_or_create(
+            first_name=first_name, last_name=last_name
         )
-        chain = prompt | model
-        chain = chain.with_config({"callbacks": [SelfQuery.opik_tracer]})
 
-        response = chain.invoke({"question": query})
-        response = response.content
+        return user_id
+
+    @staticmethod
+    def _build_chain(self_query_template: SelfQueryTemplate):
+        prompt = self_query_template.create_template()
+        chain = prompt | get_chat_model(temperature=0)
+
+        return chain.with_config({"callbacks": [SelfQuery.opik_tracer]})
+
+    @staticmethod
+    def _parse_response(response: str) -> tuple[str, str] | None:
         user_full_name = response.strip("\n ")
 
         if user_full_name == "none":
@@ -43,6 +87,5 @@ class SelfQuery:
             first_name=first_name,
             last_name=last_name,
         )
-        user_id = UserDocument.get_or_create(first_name=first_name, last_name=last_name)
 
-        return user_id
+        return first_name, last_name
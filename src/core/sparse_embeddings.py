@@ -0,0 +1,87 @@
+import threading
+from collections import Counter
+
+from qdrant_client import models
+from transformers import AutoTokenizer
+
+from core.config import settings
+
+
+class BM25SparseEncoder:
+    """
+    Computes BM25-style sparse vectors locally, using the tokenizer of the dense embedding model.
+    Document vectors hold the saturated term frequency of every token. The IDF part of BM25 is applied
+    by Qdrant at query time (the sparse vectors are configured with the IDF modifier), so query vectors
+    simply weight every distinct token with 1.
+    """
+
+    _instance: "BM25SparseEncoder | None" = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, model_id: str, k1: float, b: float, avg_doc_length: float) -> None:
+        self._tokenizer = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+        self._special_token_ids = set(self._tokenizer.all_special_ids)
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    @classmethod
+    def get_instance(cls) -> "BM25SparseEncoder":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        model_id=settings.EMBEDDING_MODEL_ID,
+                        k1=settings.BM25_K1,
+                        b=settings.BM25_B,
+                        avg_doc_length=settings.BM25_AVG_DOC_LENGTH,
+                    )
+
+        return cls._instance
+
+    def encode_documents(self, texts: list[str]) -> list[models.SparseVector]:
+        sparse_vectors = []
+        for token_ids in self._tokenize(texts):
+            term_frequencies = Counter(token_ids)
+            length_norm = self.k1 * (
+                1 - self.b + self.b * len(token_ids) / self.avg_doc_length
+            )
+            indices = list(term_frequencies.keys())
+            values = [
+                tf * (self.k1 + 1) / (tf + length_norm)
+                for tf in term_frequencies.values()
+            ]
+            sparse_vectors.append(models.SparseVector(indices=indices, values=values))
+
+        return sparse_vectors
+
+    def encode_queries(self, texts: list[str]) -> list[models.SparseVector]:
+        sparse_vectors = []
+        for token_ids in self._tokenize(texts):
+            indices = list(dict.fromkeys(token_ids))
+            sparse_vectors.append(
+                models.SparseVector(indices=indices, values=[1.0] * len(indices))
+            )
+
+        return sparse_vectors
+
+    def _tokenize(self, texts: list[str]) -> list[list[int]]:
+        if len(texts) == 0:
+            return []
+
+        encodings = self._tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+
+        return [
+            [
+                token_id
+                for token_id in token_ids
+                if token_id not in self._special_token_ids
+            ]
+            for token_ids in encodings["input_ids"]
+        ]
@@ -0,0 +1,226 @@
+import sys
+from pathlib import Path
+
+# To mimic using multiple Python modules, such as 'core' and 'feature_pipeline',
+# we will add the './src' directory to the PYTHONPATH. This is not intended for
+# production use cases but for development and educational purposes.
+ROOT_DIR = str(Path(__file__).parent.parent)
+sys.path.append(ROOT_DIR)
+
+
+from core import get_logger
+from core.config import settings as core_settings
+
+logger = get_logger(__name__)
+
+core_settings.patch_localhost()
+logger.warning(
+    "Patched settings to work with 'localhost' URLs. \
+    Remove the 'settings.patch_localhost()' call from above when deploying or running inside Docker."
+)
+
+
+import argparse
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from config import settings
+from core.db.documents import ArticleDocument, PostDocument, RepositoryDocument
+from core.db.mongo import MongoDatabaseConnector
+from core.db.qdrant import QdrantDatabaseConnector
+from data_flow.stream_output import (
+    QdrantCleanedDataSink,
+    QdrantVectorDataSink,
+    apply_collection_schemas,
+)
+from data_logic.dispatchers import (
+    CleaningDispatcher,
+    EmbeddingDispatcher,
+    IncrementalChunkingDispatcher,
+    RawDispatcher,
+)
+from utils.embeddings import EmbeddingModelRegistry
+
+COLLECTIONS = [
+    PostDocument.Settings.name,
+    ArticleDocument.Settings.name,
+    RepositoryDocument.Settings.name,
+]
+
+# Per-process state, created by the initializer of the process pool.
+_cleaned_data_sink: QdrantCleanedDataSink | None = None
+_vector_data_sink: QdrantVectorDataSink | None = None
+
+
+class BackfillCheckpoint:
+    """
+    Keeps the _id of the last document written to Qdrant for every MongoDB collection.
+    Documents are scanned in _id order, so a backfill resumes right after the last checkpointed _id.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._last_ids: dict[str, str] = {}
+
+        if self.path.exists():
+            with self.path.open("r") as f:
+                self._last_ids = json.load(f)
+
+    def get(self, collection_name: str) -> str | None:
+        return self._last_ids.get(collection_name)
+
+    def update(self, collection_name: str, last_id: str) -> None:
+        self._last_ids[collection_name] = last_id
+
+        # Write to a temporary file first, so a crash never leaves a truncated checkpoint behind.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w") as f:
+            json.dump(self._last_ids, f)
+        tmp_path.replace(self.path)
+
+    def reset(self) -> None:
+        self._last_ids = {}
+        self.path.unlink(missing_ok=True)
+
+
+def init_worker() -> None:
+    global _cleaned_data_sink, _vector_data_sink
+
+    EmbeddingModelRegistry.warm_up()
+
+    connection = QdrantDatabaseConnector()
+    # Wait for the upserts to be applied, so the checkpoint never moves past documents Qdrant didn't store.
+    _cleaned_data_sink = QdrantCleanedDataSink(connection=connection, wait=True)
+    _vector_data_sink = QdrantVectorDataSink(connection=connection, wait=True)
+
+
+def process_batch(messages: list[dict]) -> tuple[int, int]:
+    """Run a batch of raw documents through the same dispatchers as the streaming pipeline and write it to Qdrant."""
+
+    raw_models = [RawDispatcher.handle_mq_message(message) for message in messages]
+    cleaned_models = [
+        CleaningDispatcher.dispatch_cleaner(raw_model) for raw_model in raw_models
+    ]
+    _cleaned_data_sink.write_batch(cleaned_models)
+
+    # Re-embed every chunk (e.g. after changing the embedding model), but still drop the orphaned ones.
+    chunk_models = IncrementalChunkingDispatcher.dispatch_batch_chunker(
+        cleaned_models, force=True
+    )
+    embedded_models = []
+    for i in range(0, len(chunk_models), settings.EMBEDDING_BATCH_SIZE):
+        embedded_models.extend(
+            EmbeddingDispatcher.dispatch_batch_embedder(
+                chunk_models[i : i + settings.EMBEDDING_BATCH_SIZE]
+            )
+        )
+    if embedded_models:
+        _vector_data_sink.write_batch(embedded_models)
+
+    return len(cleaned_models), len(embedded_models)
+
+
+def iter_batches(collection_name: str, last_id: str | None, batch_size: int):
+    """Yield the documents of a collection in batches of messages shaped like the CDC ones, in _id order."""
+
+    database = MongoDatabaseConnector()[core_settings.MONGO_DATABASE_NAME]
+    query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+    cursor = (
+        database[collection_name].find(query).sort("_id", 1).batch_size(batch_size)
+    )
+
+    batch = []
+    for document in cursor:
+        document["entry_id"] = str(document.pop("_id"))
+        document["type"] = collection_name
+        batch.append(document)
+
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def backfill(collection_names: list[str], checkpoint: BackfillCheckpoint) -> None:
+    # Create the Qdrant collections up front, instead of racing to create them from every worker process.
+    apply_collection_schemas(QdrantDatabaseConnector())
+
+    # Spawn (instead of fork) the workers, so they don't inherit the Qdrant and MongoDB clients of this process.
+    with ProcessPoolExecutor(
+        max_workers=settings.BACKFILL_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    ) as executor:
+        for collection_name in collection_names:
+            last_id = checkpoint.get(collection_name)
+            logger.info(
+                "Starting backfill.", collection_name=collection_name, last_id=last_id
+            )
+
+            num_documents = 0
+            num_chunks = 0
+            # Batches complete out of order, so the checkpoint only advances past the oldest pending batch
+            # once it is done. Capping the pending batches also bounds the memory used by the queued documents.
+            pending_batches: deque[tuple[Future, str]] = deque()
+            for messages in iter_batches(
+                collection_name, last_id, settings.BACKFILL_BATCH_SIZE
+            ):
+                pending_batches.append(
+                    (
+                        executor.submit(process_batch, messages),
+                        messages[-1]["entry_id"],
+                    )
+                )
+
+                while pending_batches and (
+                    len(pending_batches) >= settings.BACKFILL_MAX_PENDING_BATCHES
+                    or pending_batches[0][0].done()
+                ):
+                    future, batch_last_id = pending_batches.popleft()
+                    batch_num_documents, batch_num_chunks = future.result()
+                    num_documents += batch_num_documents
+                    num_chunks += batch_num_chunks
+                    checkpoint.update(collection_name, batch_last_id)
+
+            for future, batch_last_id in pending_batches:
+                batch_num_documents, batch_num_chunks = future.result()
+                num_documents += batch_num_documents
+                num_chunks += batch_num_chunks
+                checkpoint.update(collection_name, batch_last_id)
+
+            logger.info(
+                "Backfill finished.",
+                collection_name=collection_name,
+                num_documents=num_documents,
+                num_chunks=num_chunks,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Backfill the cleaned and vector Qdrant collections straight from MongoDB."
+    )
+    parser.add_argument(
+        "--collections",
+        nargs="+",
+        choices=COLLECTIONS,
+        default=COLLECTIONS,
+        help="MongoDB collections to backfill.",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Ignore the checkpoint and backfill the collections from the beginning.",
+    )
+    args = parser.parse_args()
+
+    checkpoint = BackfillCheckpoint(path=settings.BACKFILL_CHECKPOINT_PATH)
+    if args.reset:
+        checkpoint.reset()
+
+    backfill(collection_names=args.collections, checkpoint=checkpoint)
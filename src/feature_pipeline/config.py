@@ -18,6 +18,16 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL_MAX_INPUT_LENGTH: int = 512
     EMBEDDING_SIZE: int = 384
     EMBEDDING_MODEL_DEVICE: str = "cpu"
+    INSTRUCTOR_MODEL_ID: str = "hkunlp/instructor-xl"
+    EMBEDDING_BATCH_SIZE: int = 32  # Max number of chunks embedded in a single encode call.
+    EMBEDDING_BATCH_TIMEOUT_MS: int = 200  # Max time to wait for a batch to fill up.
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = str(Path(ROOT_DIR) / ".cache" / "embeddings.sqlite")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 1_000_000
+
+    # Incremental ingestion config
+    INCREMENTAL_INGESTION_ENABLED: bool = True  # Skip unchanged documents and delete orphaned chunks.
+    DOCUMENT_MANIFEST_PATH: str = str(Path(ROOT_DIR) / ".cache" / "documents.sqlite")
 
     # OpenAI
     OPENAI_MODEL_ID: str = "gpt-4o-mini"
@@ -29,6 +39,12 @@ class Settings(BaseSettings):
     RABBITMQ_HOST: str = "mq"  # or localhost if running outside Docker
     RABBITMQ_PORT: int = 5672
     RABBITMQ_QUEUE_NAME: str = "default"
+    RABBITMQ_PREFETCH_COUNT: int = 256  # Max number of unacked messages pushed to each consumer.
+    RABBITMQ_POLL_INTERVAL_MS: int = 100  # How long an idle consumer waits before polling the queue again.
+
+    # Bytewax config
+    BYTEWAX_PROCESSES: int = 1  # Number of processes started by scripts/bytewax_entrypoint.sh
+    BYTEWAX_WORKERS_PER_PROCESS: int = 1
 
     # QdrantDB config
     QDRANT_DATABASE_HOST: str = "qdrant"  # or localhost if running outside Docker
@@ -38,6 +54,39 @@ class Settings(BaseSettings):
     )
     QDRANT_CLOUD_URL: str | None = None
     QDRANT_APIKEY: str | None = None
+    QDRANT_UPSERT_BATCH_SIZE: int = 256  # Max number of points sent in a single upsert request.
+    QDRANT_UPSERT_PARALLELISM: int = 4  # Max number of concurrent upsert requests per sink.
+
+    # RAG config
+    RAG_HYBRID_SEARCH: bool = True  # Fuse the dense search with a BM25 sparse search.
+    RAG_FUSION_METHOD: str = "rrf"  # How duplicate hits are merged. One of: rrf, max.
+    RAG_RRF_K: int = 60
+    RAG_MAX_RERANK_CANDIDATES: int = 20  # Max number of unique hits sent to the reranker.
+
+    # RAG response cache config
+    RAG_RESPONSE_CACHE_BACKEND: str = "memory"  # One of: none, memory, disk.
+    RAG_RESPONSE_CACHE_MAX_ENTRIES: int = 10_000  # Only used by the in-memory backend.
+    RAG_RESPONSE_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    RAG_RESPONSE_CACHE_PATH: str = str(Path(ROOT_DIR) / ".cache" / "rag_responses.sqlite")
+
+    # Reranking config
+    RERANKER_BACKEND: str = "openai"  # One of: openai, cross_encoder.
+    RERANKER_CROSS_ENCODER_MODEL_ID: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANKER_BATCH_SIZE: int = 32  # Number of (query, passage) pairs scored together.
+
+    # Backfill config
+    BACKFILL_BATCH_SIZE: int = 64  # Number of MongoDB documents processed together.
+    BACKFILL_PROCESSES: int = 4
+    BACKFILL_MAX_PENDING_BATCHES: int = 8  # Max number of batches queued on the process pool.
+    BACKFILL_CHECKPOINT_PATH: str = str(
+        Path(ROOT_DIR) / ".cache" / "backfill_checkpoint.json"
+    )
+
+    @property
+    def num_workers(self) -> int:
+        """Total number of Bytewax workers across all the processes of the dataflow."""
+
+        return self.BYTEWAX_PROCESSES * self.BYTEWAX_WORKERS_PER_PROCESS
 
 
 settings = Settings()
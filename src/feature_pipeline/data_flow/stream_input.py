@@ -1,6 +1,6 @@
 import json
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Generic, Iterable, List, Optional, TypeVar
 
 from bytewax.inputs import FixedPartitionedSource, StatefulSourcePartition
@@ -17,56 +17,115 @@ MessageT = TypeVar("MessageT")
 class RabbitMQPartition(StatefulSourcePartition, Generic[DataT, MessageT]):
     """
     Class responsible for creating a connection between bytewax and rabbitmq that facilitates the transfer of data from mq to bytewax streaming piepline.
-    Inherits StatefulSourcePartition for snapshot functionality that enables saving the state of the queue
+    Inherits StatefulSourcePartition for snapshot functionality that enables saving the state of the queue.
+
+    Messages are pushed by the broker (basic_consume) up to RABBITMQ_PREFETCH_COUNT unacknowledged messages,
+    and every buffered message is returned in one batch. When the queue is empty, the partition isn't polled
+    again before RABBITMQ_POLL_INTERVAL_MS, so idle workers don't spin.
+
+    Delivery guarantee: messages are acknowledged when the epoch they were emitted in is snapshotted, which
+    is before the Qdrant sinks write them. Messages that were never emitted (e.g. the worker crashed or lost
+    its channel) are redelivered, but a crash after the ack loses the documents still in flight in the
+    dataflow. The documents are stored in MongoDB, so the backfill (make local-backfill-feature-pipeline)
+    restores them.
     """
 
     def __init__(self, queue_name: str, resume_state: MessageT | None = None) -> None:
-        self._in_flight_msg_ids = resume_state or set()
         self.queue_name = queue_name
         self.connection = RabbitMQConnection()
+        self._connect()
+
+    def _connect(self) -> None:
+        self._buffered_messages: list[tuple[int, bytes]] = []
+        self._last_emitted_delivery_tag: int | None = None
+        self._next_awake: datetime | None = None
+
         self.connection.connect()
         self.channel = self.connection.get_channel()
+        self.channel.queue_declare(queue=self.queue_name, durable=True)
+        self.channel.basic_qos(prefetch_count=settings.RABBITMQ_PREFETCH_COUNT)
+        self.channel.basic_consume(
+            queue=self.queue_name,
+            on_message_callback=self._on_message,
+            auto_ack=False,
+        )
+
+    def _disconnect(self) -> None:
+        try:
+            # Closing the connection closes its channel as well.
+            self.connection.close()
+        except Exception:
+            # The connection is usually already broken here, so there is nothing left to close.
+            logger.warning(
+                "Failed to close the RabbitMQ connection.", queue_name=self.queue_name
+            )
+
+    def _on_message(self, channel, method_frame, header_frame, body: bytes) -> None:
+        self._buffered_messages.append((method_frame.delivery_tag, body))
 
     def next_batch(self, sched: Optional[datetime]) -> Iterable[DataT]:
         try:
-            method_frame, header_frame, body = self.channel.basic_get(
-                queue=self.queue_name, auto_ack=True
-            )
+            # Dispatch the deliveries already received from the broker without blocking.
+            self.connection.process_data_events(time_limit=0)
         except Exception:
             logger.error(
                 f"Error while fetching message from queue.", queue_name=self.queue_name
             )
             time.sleep(10)  # Sleep for 10 seconds before retrying to access the queue.
 
-            self.connection.connect()
-            self.channel = self.connection.get_channel()
+            # Unacked messages are redelivered by the broker once the old channel is closed.
+            self._disconnect()
+            self._connect()
 
             return []
 
-        if method_frame:
-            message_id = method_frame.delivery_tag
-            self._in_flight_msg_ids.add(message_id)
+        if not self._buffered_messages:
+            self._next_awake = datetime.now(timezone.utc) + timedelta(
+                milliseconds=settings.RABBITMQ_POLL_INTERVAL_MS
+            )
 
-            return [json.loads(body)]
-        else:
             return []
 
-    def snapshot(self) -> MessageT:
-        return self._in_flight_msg_ids
+        self._next_awake = None
+        messages, self._buffered_messages = self._buffered_messages, []
+        self._last_emitted_delivery_tag = messages[-1][0]
+
+        return [json.loads(body) for _, body in messages]
+
+    def next_awake(self) -> Optional[datetime]:
+        # None polls again right away, which keeps the partition busy while messages keep arriving.
+        return self._next_awake
 
-    def garbage_collect(self, state):
-        closed_in_flight_msg_ids = state
-        for msg_id in closed_in_flight_msg_ids:
-            self.channel.basic_ack(delivery_tag=msg_id)
-            self._in_flight_msg_ids.remove(msg_id)
+    def snapshot(self) -> MessageT:
+        # The runtime snapshots the partition when the epoch closes. Every message emitted so far is
+        # acknowledged at once, as delivery tags are increasing on a channel.
+        if self._last_emitted_delivery_tag is not None:
+            try:
+                self.channel.basic_ack(
+                    delivery_tag=self._last_emitted_delivery_tag, multiple=True
+                )
+            except Exception:
+                # The broker redelivers the messages once the channel is reopened by next_batch.
+                logger.exception(
+                    "Failed to acknowledge messages.", queue_name=self.queue_name
+                )
+            self._last_emitted_delivery_tag = None
+
+        # Delivery tags are scoped to the channel, so there is nothing to resume from.
+        return None
 
     def close(self):
-        self.channel.close()
+        self._disconnect()
 
 
 class RabbitMQSource(FixedPartitionedSource):
+    """
+    Each partition is an independent consumer of the same queue. RabbitMQ load-balances the messages
+    between the consumers, and Bytewax spreads the partitions across all the workers of the dataflow.
+    """
+
     def list_parts(self) -> List[str]:
-        return ["single partition"]
+        return [f"partition-{index}" for index in range(settings.num_workers)]
 
     def build_part(
         self, now: datetime, for_part: str, resume_state: MessageT | None = None
@@ -1,8 +1,18 @@
+import time
+from abc import abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from bytewax.outputs import DynamicSink, StatelessSinkPartition
+from config import settings
 from core import get_logger
-from core.db.qdrant import QdrantDatabaseConnector
+from core.db.qdrant import QdrantDatabaseConnector, cast_vectors
+from core.db.qdrant_schema import COLLECTION_SCHEMAS, get_collection_schema
+from core.sparse_embeddings import BM25SparseEncoder
 from models.base import VectorDBDataModel
 from qdrant_client.models import Batch
+from utils.document_manifest import DocumentManifest, ManifestEntry
 
 logger = get_logger(__name__)
 
@@ -17,33 +27,6 @@ class QdrantOutput(DynamicSink):
         self._connection = connection
         self._sink_type = sink_type
 
-        collections = {
-            "cleaned_posts": False,
-            "cleaned_articles": False,
-            "cleaned_repositories": False,
-            "vector_posts": True,
-            "vector_articles": True,
-            "vector_repositories": True,
-        }
-
-        for collection_name, is_vector in collections.items():
-            try:
-                self._connection.get_collection(collection_name=collection_name)
-            except Exception:
-                logger.warning(
-                    "Couldn't access the collection. Creating a new one...",
-                    collection_name=collection_name,
-                )
-
-                if is_vector:
-                    self._connection.create_vector_collection(
-                        collection_name=collection_name
-                    )
-                else:
-                    self._connection.create_non_vector_collection(
-                        collection_name=collection_name
-                    )
-
     def build(self, worker_index: int, worker_count: int) -> StatelessSinkPartition:
         if self._sink_type == "clean":
             return QdrantCleanedDataSink(connection=self._connection)
@@ -53,44 +36,163 @@ class QdrantOutput(DynamicSink):
             raise ValueError(f"Unsupported sink type: {self._sink_type}")
 
 
-class QdrantCleanedDataSink(StatelessSinkPartition):
-    def __init__(self, connection: QdrantDatabaseConnector):
+def apply_collection_schemas(connection: QdrantDatabaseConnector) -> None:
+    """Create the missing collections and bring the existing ones up to date with their schema."""
+
+    for schema in COLLECTION_SCHEMAS:
+        connection.apply_collection_schema(schema)
+
+
+class QdrantDataSink(StatelessSinkPartition):
+    """
+    Base class for the Qdrant sinks.
+    Each batch is split by data type into per-collection sub-batches of at most QDRANT_UPSERT_BATCH_SIZE points,
+    which are upserted in parallel. By default, the upserts don't wait for Qdrant to apply them. With wait=True,
+    write_batch only returns once the points are stored (e.g. before a checkpoint moves past them).
+    """
+
+    def __init__(self, connection: QdrantDatabaseConnector, wait: bool = False):
         self._client = connection
+        self._wait = wait
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.QDRANT_UPSERT_PARALLELISM
+        )
+        self.metrics: dict[str, dict] = defaultdict(
+            lambda: {"num_points": 0, "num_requests": 0, "write_latency_seconds": 0.0}
+        )
+
+    @abstractmethod
+    def get_collection_name(self, data_type: str) -> str:
+        pass
+
+    @abstractmethod
+    def to_points(self, collection_name: str, items: list[VectorDBDataModel]) -> Batch:
+        pass
 
     def write_batch(self, items: list[VectorDBDataModel]) -> None:
-        payloads = [item.to_payload() for item in items]
-        ids, data = zip(*payloads)
-        collection_name = get_clean_collection(data_type=data[0]["type"])
+        items_by_collection: dict[str, list[VectorDBDataModel]] = defaultdict(list)
+        for item in items:
+            items_by_collection[self.get_collection_name(item.type)].append(item)
+
+        batch_size = settings.QDRANT_UPSERT_BATCH_SIZE
+        write_tasks = [
+            self._executor.submit(
+                self._write_sub_batch, collection_name, collection_items[i : i + batch_size]
+            )
+            for collection_name, collection_items in items_by_collection.items()
+            for i in range(0, len(collection_items), batch_size)
+        ]
+        for task in write_tasks:
+            collection_name, num_points, latency = task.result()
+
+            collection_metrics = self.metrics[collection_name]
+            collection_metrics["num_points"] += num_points
+            collection_metrics["num_requests"] += 1
+            collection_metrics["write_latency_seconds"] += latency
+
+            logger.info(
+                "Successfully inserted requested point(s)",
+                collection_name=collection_name,
+                num=num_points,
+                write_latency_ms=round(latency * 1000, 2),
+                total_num_points=collection_metrics["num_points"],
+            )
+
+    def _write_sub_batch(
+        self, collection_name: str, items: list[VectorDBDataModel]
+    ) -> tuple[str, int, float]:
+        points = self.to_points(collection_name, items)
+
+        start_time = time.perf_counter()
         self._client.write_data(
-            collection_name=collection_name,
-            points=Batch(ids=ids, vectors={}, payloads=data),
+            collection_name=collection_name, points=points, wait=self._wait
         )
+        latency = time.perf_counter() - start_time
 
-        logger.info(
-            "Successfully inserted requested cleaned point(s)",
-            collection_name=collection_name,
-            num=len(ids),
-        )
+        return collection_name, len(items), latency
 
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
 
-class QdrantVectorDataSink(StatelessSinkPartition):
-    def __init__(self, connection: QdrantDatabaseConnector):
-        self._client = connection
+
+class QdrantCleanedDataSink(QdrantDataSink):
+    def get_collection_name(self, data_type: str) -> str:
+        return get_clean_collection(data_type=data_type)
+
+    def to_points(self, collection_name: str, items: list[VectorDBDataModel]) -> Batch:
+        payloads = [item.to_payload() for item in items]
+        ids, data = zip(*payloads)
+
+        return Batch(ids=ids, vectors={}, payloads=data)
+
+
+class QdrantVectorDataSink(QdrantDataSink):
+    def get_collection_name(self, data_type: str) -> str:
+        return get_vector_collection(data_type=data_type)
 
     def write_batch(self, items: list[VectorDBDataModel]) -> None:
+        super().write_batch(items)
+
+        if settings.INCREMENTAL_INGESTION_ENABLED:
+            # Only now that the chunks are written are the documents they belong to safe to skip.
+            chunk_ids_by_entry_id: dict[str, list[str]] = defaultdict(list)
+            collection_by_entry_id: dict[str, str] = {}
+            for item in items:
+                chunk_ids_by_entry_id[item.entry_id].append(item.chunk_id)
+                collection_by_entry_id[item.entry_id] = self.get_collection_name(
+                    item.type
+                )
+            committed_entries = DocumentManifest.get_instance().mark_written(
+                chunk_ids_by_entry_id
+            )
+            logger.info("Committed ingested documents.", num=len(committed_entries))
+
+            self._delete_orphaned_chunks(committed_entries, collection_by_entry_id)
+
+    def _delete_orphaned_chunks(
+        self,
+        committed_entries: dict[str, ManifestEntry],
+        collection_by_entry_id: dict[str, str],
+    ) -> None:
+        """
+        Delete the chunks of the committed documents that are not part of their current version. They are
+        looked up in Qdrant rather than in the manifest, so the chunks written before the manifest existed
+        (or by another host) are deleted as well.
+        """
+
+        chunk_ids_by_collection: dict[str, dict[str, list[str]]] = defaultdict(dict)
+        for entry_id, entry in committed_entries.items():
+            chunk_ids_by_collection[collection_by_entry_id[entry_id]][entry_id] = (
+                entry.chunk_ids
+            )
+
+        for collection_name, chunk_ids_by_entry_id in chunk_ids_by_collection.items():
+            self._client.delete_orphaned_points(
+                collection_name=collection_name,
+                point_ids_by_entry_id=chunk_ids_by_entry_id,
+                wait=self._wait,
+            )
+            logger.info(
+                "Deleted orphaned chunks.",
+                collection_name=collection_name,
+                num_documents=len(chunk_ids_by_entry_id),
+            )
+
+    def to_points(self, collection_name: str, items: list[VectorDBDataModel]) -> Batch:
         payloads = [item.to_payload() for item in items]
         ids, vectors, meta_data = zip(*payloads)
-        collection_name = get_vector_collection(data_type=meta_data[0]["type"])
-        self._client.write_data(
-            collection_name=collection_name,
-            points=Batch(ids=ids, vectors=vectors, payloads=meta_data),
-        )
-
-        logger.info(
-            "Successfully inserted requested vector point(s)",
-            collection_name=collection_name,
-            num=len(ids),
-        )
+        # Convert the whole sub-batch to Python lists at once instead of letting the client convert every vector.
+        vectors = cast_vectors(np.vstack(vectors)).tolist()
+
+        sparse_vector_name = get_collection_schema(collection_name).sparse_vector_name
+        if sparse_vector_name and self._client.has_sparse_vectors(collection_name):
+            sparse_vectors = BM25SparseEncoder.get_instance().encode_documents(
+                [data["content"] for data in meta_data]
+            )
+            # The dense vectors are the default (unnamed) vectors of the collection.
+            vectors = {"": vectors, sparse_vector_name: sparse_vectors}
+
+        return Batch(ids=ids, vectors=vectors, payloads=meta_data)
 
 
 def get_clean_collection(data_type: str) -> str:
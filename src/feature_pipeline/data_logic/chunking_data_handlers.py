@@ -4,7 +4,7 @@ from abc import ABC, abstractmethod
 from models.base import DataModel
 from models.chunk import ArticleChunkModel, PostChunkModel, RepositoryChunkModel
 from models.clean import ArticleCleanedModel, PostCleanedModel, RepositoryCleanedModel
-from utils.chunking import chunk_text
+from utils.chunking import ChunkingEngine
 
 
 class ChunkingDataHandler(ABC):
@@ -13,72 +13,82 @@ class ChunkingDataHandler(ABC):
     All data transformations logic for the chunking step is done here
     """
 
-    @abstractmethod
-    def chunk(self, data_model: DataModel) -> list[DataModel]:
-        pass
-
+    data_type: str
 
-class PostChunkingHandler(ChunkingDataHandler):
-    def chunk(self, data_model: PostCleanedModel) -> list[PostChunkModel]:
-        data_models_list = []
+    def chunk(self, data_model: DataModel) -> list[DataModel]:
+        return self.chunk_batch([data_model])
 
-        text_content = data_model.cleaned_content
-        chunks = chunk_text(text_content)
+    def chunk_batch(self, data_models: list[DataModel]) -> list[DataModel]:
+        batch_chunks = ChunkingEngine.chunk_batch(
+            [data_model.cleaned_content for data_model in data_models],
+            data_type=self.data_type,
+        )
 
-        for chunk in chunks:
-            model = PostChunkModel(
-                entry_id=data_model.entry_id,
-                platform=data_model.platform,
-                chunk_id=hashlib.md5(chunk.encode()).hexdigest(),
-                chunk_content=chunk,
-                author_id=data_model.author_id,
-                image=data_model.image if data_model.image else None,
-                type=data_model.type,
-            )
-            data_models_list.append(model)
+        return [
+            self.map_model(data_model, chunk)
+            for data_model, chunks in zip(data_models, batch_chunks)
+            for chunk in chunks
+        ]
 
-        return data_models_list
+    @abstractmethod
+    def map_model(self, data_model: DataModel, chunk: str) -> DataModel:
+        pass
 
 
-class ArticleChunkingHandler(ChunkingDataHandler):
-    def chunk(self, data_model: ArticleCleanedModel) -> list[ArticleChunkModel]:
-        data_models_list = []
+class PostChunkingHandler(ChunkingDataHandler):
+    data_type = "posts"
 
-        text_content = data_model.cleaned_content
-        chunks = chunk_text(text_content)
+    def map_model(self, data_model: PostCleanedModel, chunk: str) -> PostChunkModel:
+        return PostChunkModel(
+            entry_id=data_model.entry_id,
+            platform=data_model.platform,
+            chunk_id=compute_chunk_id(data_model.entry_id, chunk),
+            chunk_content=chunk,
+            author_id=data_model.author_id,
+            image=data_model.image if data_model.image else None,
+            type=data_model.type,
+        )
 
-        for chunk in chunks:
-            model = ArticleChunkModel(
-                entry_id=data_model.entry_id,
-                platform=data_model.platform,
-                link=data_model.link,
-                chunk_id=hashlib.md5(chunk.encode()).hexdigest(),
-                chunk_content=chunk,
-                author_id=data_model.author_id,
-                type=data_model.type,
-            )
-            data_models_list.append(model)
 
-        return data_models_list
+class ArticleChunkingHandler(ChunkingDataHandler):
+    data_type = "articles"
+
+    def map_model(
+        self, data_model: ArticleCleanedModel, chunk: str
+    ) -> ArticleChunkModel:
+        return ArticleChunkModel(
+            entry_id=data_model.entry_id,
+            platform=data_model.platform,
+            link=data_model.link,
+            chunk_id=compute_chunk_id(data_model.entry_id, chunk),
+            chunk_content=chunk,
+            author_id=data_model.author_id,
+            type=data_model.type,
+        )
 
 
 class RepositoryChunkingHandler(ChunkingDataHandler):
-    def chunk(self, data_model: RepositoryCleanedModel) -> list[RepositoryChunkModel]:
-        data_models_list = []
-
-        text_content = data_model.cleaned_content
-        chunks = chunk_text(text_content)
-
-        for chunk in chunks:
-            model = RepositoryChunkModel(
-                entry_id=data_model.entry_id,
-                name=data_model.name,
-                link=data_model.link,
-                chunk_id=hashlib.md5(chunk.encode()).hexdigest(),
-                chunk_content=chunk,
-                owner_id=data_model.owner_id,
-                type=data_model.type,
-            )
-            data_models_list.append(model)
-
-        return data_models_list
+    data_type = "repositories"
+
+    def map_model(
+        self, data_model: RepositoryCleanedModel, chunk: str
+    ) -> RepositoryChunkModel:
+        return RepositoryChunkModel(
+            entry_id=data_model.entry_id,
+            name=data_model.name,
+            link=data_model.link,
+            chunk_id=compute_chunk_id(data_model.entry_id, chunk),
+            chunk_content=chunk,
+            owner_id=data_model.owner_id,
+            type=data_model.type,
+        )
+
+
+def compute_chunk_id(entry_id: str, chunk: str) -> str:
+    """
+    The chunk id is also the id of its Qdrant point. It is scoped to the document, so a chunk shared by
+    several documents (e.g. a boilerplate paragraph) is stored once per document and can be deleted safely
+    when one of them is edited.
+    """
+
+    return hashlib.md5(f"{entry_id}:{chunk}".encode()).hexdigest()
@@ -1,6 +1,14 @@
+from config import settings
 from core import get_logger
 from models.base import DataModel
 from models.raw import ArticleRawModel, PostsRawModel, RepositoryRawModel
+from utils.document_manifest import (
+    DocumentManifest,
+    ManifestEntry,
+    compute_content_hash,
+)
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import embedd_chunks
 
 from data_logic.chunking_data_handlers import (
     ArticleChunkingHandler,
@@ -102,6 +110,145 @@ class ChunkingDispatcher:
 
         return chunk_models
 
+    @classmethod
+    def dispatch_batch_chunker(cls, data_models: list[DataModel]) -> list[DataModel]:
+        """Chunk a batch of documents, splitting all the documents of the same data type in one call."""
+
+        data_models_by_type: dict[str, list[DataModel]] = {}
+        for data_model in data_models:
+            data_models_by_type.setdefault(data_model.type, []).append(data_model)
+
+        chunk_models = []
+        for data_type, type_data_models in data_models_by_type.items():
+            handler = cls.cleaning_factory.create_handler(data_type)
+            chunk_models.extend(handler.chunk_batch(type_data_models))
+
+        logger.info(
+            "Cleaned content chunked successfully.",
+            num_documents=len(data_models),
+            num=len(chunk_models),
+        )
+
+        return chunk_models
+
+
+class IncrementalChunkingDispatcher:
+    """
+    Chunks only the documents whose cleaned content changed since they were last ingested.
+    Only the chunks that weren't ingested before are emitted for embedding. The chunks of an edited document
+    that are not part of its new version are deleted by the vector sink once the new version is written.
+    """
+
+    @classmethod
+    def has_changed(cls, data_model: DataModel) -> bool:
+        if not settings.INCREMENTAL_INGESTION_ENABLED:
+            return True
+
+        manifest_entry = DocumentManifest.get_instance().get_many([data_model.entry_id])
+        previous_entry = manifest_entry.get(data_model.entry_id)
+        has_changed = previous_entry is None or previous_entry.content_hash != (
+            compute_content_hash(data_model.cleaned_content)
+        )
+        if not has_changed:
+            logger.info(
+                "Skipping unchanged document.",
+                entry_id=data_model.entry_id,
+                data_type=data_model.type,
+            )
+
+        return has_changed
+
+    @classmethod
+    def dispatch_batch_chunker(
+        cls, data_models: list[DataModel], force: bool = False
+    ) -> list[DataModel]:
+        """
+        Chunk the changed documents of a batch. With force=True, every document is re-chunked and all its chunks
+        are emitted (e.g. to re-embed them with a new model).
+        """
+
+        if not settings.INCREMENTAL_INGESTION_ENABLED:
+            return ChunkingDispatcher.dispatch_batch_chunker(data_models)
+
+        manifest = DocumentManifest.get_instance()
+        previous_entries = manifest.get_many(
+            [data_model.entry_id for data_model in data_models]
+        )
+
+        changed_data_models = {}
+        for data_model in data_models:
+            previous_entry = previous_entries.get(data_model.entry_id)
+            content_hash = compute_content_hash(data_model.cleaned_content)
+            if (
+                force
+                or previous_entry is None
+                or previous_entry.content_hash != content_hash
+            ):
+                changed_data_models[data_model.entry_id] = (data_model, content_hash)
+        if not changed_data_models:
+            return []
+
+        chunk_models = ChunkingDispatcher.dispatch_batch_chunker(
+            [data_model for data_model, _ in changed_data_models.values()]
+        )
+        chunk_models_by_entry_id: dict[str, list[DataModel]] = {
+            entry_id: [] for entry_id in changed_data_models
+        }
+        for chunk_model in chunk_models:
+            chunk_models_by_entry_id[chunk_model.entry_id].append(chunk_model)
+        chunk_ids_by_entry_id = {
+            entry_id: [chunk_model.chunk_id for chunk_model in entry_chunk_models]
+            for entry_id, entry_chunk_models in chunk_models_by_entry_id.items()
+        }
+
+        if force:
+            new_chunk_models = chunk_models
+        else:
+            previous_chunk_ids = {
+                entry_id: set(entry.chunk_ids)
+                for entry_id, entry in previous_entries.items()
+            }
+            new_chunk_models = [
+                chunk_model
+                for chunk_model in chunk_models
+                if chunk_model.chunk_id
+                not in previous_chunk_ids.get(chunk_model.entry_id, set())
+            ]
+            # An edit that only removed text has no new chunk. One of its chunks is written again anyway, so the
+            # document is committed by the vector sink, which deletes its orphaned chunks.
+            entry_ids_with_new_chunks = {
+                chunk_model.entry_id for chunk_model in new_chunk_models
+            }
+            for entry_id, entry_chunk_models in chunk_models_by_entry_id.items():
+                if entry_id not in entry_ids_with_new_chunks and entry_chunk_models:
+                    new_chunk_models.append(entry_chunk_models[0])
+            logger.info(
+                "Detected new chunks.",
+                num_documents=len(data_models),
+                num_changed_documents=len(changed_data_models),
+                num=len(new_chunk_models),
+            )
+
+        # The entries are only committed once the vector sink wrote all the emitted chunks. Until then,
+        # replaying a document processes it again instead of skipping it.
+        pending_chunk_ids_by_entry_id: dict[str, list[str]] = {}
+        for chunk_model in new_chunk_models:
+            pending_chunk_ids_by_entry_id.setdefault(chunk_model.entry_id, []).append(
+                chunk_model.chunk_id
+            )
+        manifest.stage_many(
+            {
+                entry_id: ManifestEntry(
+                    content_hash=content_hash,
+                    chunk_ids=chunk_ids_by_entry_id[entry_id],
+                )
+                for entry_id, (_, content_hash) in changed_data_models.items()
+            },
+            pending_chunk_ids=pending_chunk_ids_by_entry_id,
+        )
+
+        return new_chunk_models
+
 
 class EmbeddingHandlerFactory:
     @staticmethod
@@ -132,3 +279,31 @@ class EmbeddingDispatcher:
         )
 
         return embedded_chunk_model
+
+    @classmethod
+    def dispatch_batch_embedder(cls, data_models: list[DataModel]) -> list[DataModel]:
+        """Embed a batch of chunks of any data type with a single encode call, preserving the input order."""
+
+        if len(data_models) == 0:
+            return []
+
+        embeddings = embedd_chunks(
+            texts=[data_model.chunk_content for data_model in data_models]
+        )
+        embedded_chunk_models = [
+            cls.cleaning_factory.create_handler(data_model.type).map_model(
+                data_model, embedded_content
+            )
+            for data_model, embedded_content in zip(data_models, embeddings)
+        ]
+
+        cache = EmbeddingCache.get_instance() if settings.EMBEDDING_CACHE_ENABLED else None
+        logger.info(
+            "Chunks embedded successfully.",
+            num=len(embedded_chunk_models),
+            embedding_len=embeddings.shape[1],
+            cache_hits=cache.hits if cache else None,
+            cache_misses=cache.misses if cache else None,
+        )
+
+        return embedded_chunk_models
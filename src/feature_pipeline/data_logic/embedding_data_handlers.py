@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 from models.base import DataModel
 from models.chunk import ArticleChunkModel, PostChunkModel, RepositoryChunkModel
 from models.embedded_chunk import (
@@ -7,7 +9,7 @@ from models.embedded_chunk import (
     PostEmbeddedChunkModel,
     RepositoryEmbeddedChunkModel,
 )
-from utils.embeddings import embedd_text
+from utils.embeddings import embedd_chunks
 
 
 class EmbeddingDataHandler(ABC):
@@ -16,47 +18,68 @@ class EmbeddingDataHandler(ABC):
     All data transformations logic for the embedding step is done here
     """
 
-    @abstractmethod
     def embedd(self, data_model: DataModel) -> DataModel:
+        return self.embedd_batch([data_model])[0]
+
+    def embedd_batch(self, data_models: list[DataModel]) -> list[DataModel]:
+        embeddings = embedd_chunks(
+            texts=[data_model.chunk_content for data_model in data_models]
+        )
+
+        return [
+            self.map_model(data_model, embedded_content)
+            for data_model, embedded_content in zip(data_models, embeddings)
+        ]
+
+    @abstractmethod
+    def map_model(
+        self, data_model: DataModel, embedded_content: np.ndarray
+    ) -> DataModel:
         pass
 
 
 class PostEmbeddingHandler(EmbeddingDataHandler):
-    def embedd(self, data_model: PostChunkModel) -> PostEmbeddedChunkModel:
+    def map_model(
+        self, data_model: PostChunkModel, embedded_content: np.ndarray
+    ) -> PostEmbeddedChunkModel:
         return PostEmbeddedChunkModel(
             entry_id=data_model.entry_id,
             platform=data_model.platform,
             chunk_id=data_model.chunk_id,
             chunk_content=data_model.chunk_content,
-            embedded_content=embedd_text(data_model.chunk_content),
+            embedded_content=embedded_content,
             author_id=data_model.author_id,
             type=data_model.type,
         )
 
 
 class ArticleEmbeddingHandler(EmbeddingDataHandler):
-    def embedd(self, data_model: ArticleChunkModel) -> ArticleEmbeddedChunkModel:
+    def map_model(
+        self, data_model: ArticleChunkModel, embedded_content: np.ndarray
+    ) -> ArticleEmbeddedChunkModel:
         return ArticleEmbeddedChunkModel(
             entry_id=data_model.entry_id,
             platform=data_model.platform,
             link=data_model.link,
             chunk_content=data_model.chunk_content,
             chunk_id=data_model.chunk_id,
-            embedded_content=embedd_text(data_model.chunk_content),
+            embedded_content=embedded_content,
             author_id=data_model.author_id,
             type=data_model.type,
         )
 
 
 class RepositoryEmbeddingHandler(EmbeddingDataHandler):
-    def embedd(self, data_model: RepositoryChunkModel) -> RepositoryEmbeddedChunkModel:
+    def map_model(
+        self, data_model: RepositoryChunkModel, embedded_content: np.ndarray
+    ) -> RepositoryEmbeddedChunkModel:
         return RepositoryEmbeddedChunkModel(
             entry_id=data_model.entry_id,
             name=data_model.name,
             link=data_model.link,
             chunk_id=data_model.chunk_id,
             chunk_content=data_model.chunk_content,
-            embedded_content=embedd_text(data_model.chunk_content),
+            embedded_content=embedded_content,
             owner_id=data_model.owner_id,
             type=data_model.type,
         )
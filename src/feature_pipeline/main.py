@@ -1,29 +1,62 @@
+from datetime import timedelta
+
 import bytewax.operators as op
 from bytewax.dataflow import Dataflow
+from config import settings
 from core.db.qdrant import QdrantDatabaseConnector
 from data_flow.stream_input import RabbitMQSource
-from data_flow.stream_output import QdrantOutput
+from data_flow.stream_output import QdrantOutput, apply_collection_schemas
 from data_logic.dispatchers import (
-    ChunkingDispatcher,
     CleaningDispatcher,
     EmbeddingDispatcher,
+    IncrementalChunkingDispatcher,
     RawDispatcher,
 )
+from utils.embeddings import EmbeddingModelRegistry
 
 connection = QdrantDatabaseConnector()
+# Both sinks write to the same collections, so their schemas are applied once per process.
+apply_collection_schemas(connection)
+
+# Load the embedding model once per worker process, before the first message arrives.
+EmbeddingModelRegistry.warm_up()
 
 flow = Dataflow("Streaming ingestion pipeline")
 stream = op.input("input", flow, RabbitMQSource())
+# Spread the CPU-heavy clean, chunk and embed steps across all the workers.
+stream = op.redistribute("redistribute", stream)
 stream = op.map("raw dispatch", stream, RawDispatcher.handle_mq_message)
 stream = op.map("clean dispatch", stream, CleaningDispatcher.dispatch_cleaner)
+# Re-crawled documents whose cleaned content didn't change are dropped before anything is written.
+stream = op.filter(
+    "skip unchanged documents", stream, IncrementalChunkingDispatcher.has_changed
+)
 op.output(
     "cleaned data insert to qdrant",
     stream,
     QdrantOutput(connection=connection, sink_type="clean"),
 )
-stream = op.flat_map("chunk dispatch", stream, ChunkingDispatcher.dispatch_chunker)
-stream = op.map(
-    "embedded chunk dispatch", stream, EmbeddingDispatcher.dispatch_embedder
+stream = op.flat_map_batch(
+    "chunk dispatch", stream, IncrementalChunkingDispatcher.dispatch_batch_chunker
+)
+# Group the chunks in micro-batches of up to EMBEDDING_BATCH_SIZE items (or whatever arrived within
+# EMBEDDING_BATCH_TIMEOUT_MS) so that they are embedded together in a single encode call.
+# Chunks are keyed on their chunk_id, so the batches are spread across all the workers.
+stream = op.key_on(
+    "embedding batch key",
+    stream,
+    lambda chunk: str(int(chunk.chunk_id, 16) % settings.num_workers),
+)
+stream = op.collect(
+    "embedding batch collect",
+    stream,
+    timeout=timedelta(milliseconds=settings.EMBEDDING_BATCH_TIMEOUT_MS),
+    max_size=settings.EMBEDDING_BATCH_SIZE,
+)
+stream = op.flat_map(
+    "embedded chunk dispatch",
+    stream,
+    lambda key_batch: EmbeddingDispatcher.dispatch_batch_embedder(key_batch[1]),
 )
 op.output(
     "embedded data insert to qdrant",
@@ -22,7 +22,7 @@ class PostEmbeddedChunkModel(VectorDBDataModel):
             "id": self.entry_id,
             "platform": self.platform,
             "content": self.chunk_content,
-            "owner_id": self.author_id,
+            "author_id": self.author_id,
             "type": self.type,
         }
 
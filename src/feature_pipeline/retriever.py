@@ -28,9 +28,9 @@ Could you draft an article paragraph discussing RAG?
 I'm particularly interested in how to design a RAG system.
 """
 
-    retriever = VectorRetriever(query=query)
-    hits = retriever.retrieve_top_k(k=6, to_expand_to_n_queries=5)
-    reranked_hits = retriever.rerank(hits=hits, keep_top_k=5)
+    retriever = VectorRetriever()
+    hits = retriever.retrieve_top_k(query=query, k=6, to_expand_to_n_queries=5)
+    reranked_hits = retriever.rerank(query=query, hits=hits, keep_top_k=5)
 
     logger.info("====== RETRIEVED DOCUMENTS ======")
     for rank, hit in enumerate(reranked_hits):
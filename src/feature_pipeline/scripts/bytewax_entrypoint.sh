@@ -9,7 +9,34 @@ else
         echo 'BYTEWAX_PYTHON_FILE_PATH is not set. Exiting...'
         exit 1
     fi
-    python -m bytewax.run $BYTEWAX_PYTHON_FILE_PATH
+
+    BYTEWAX_PROCESSES=${BYTEWAX_PROCESSES:-1}
+    BYTEWAX_BASE_PORT=${BYTEWAX_BASE_PORT:-2101}
+    export BYTEWAX_WORKERS_PER_PROCESS=${BYTEWAX_WORKERS_PER_PROCESS:-1}
+    # The RabbitMQ messages are acked when the epoch is snapshotted, so keep epochs short.
+    export BYTEWAX_SNAPSHOT_INTERVAL=${BYTEWAX_SNAPSHOT_INTERVAL:-1}
+
+    if [ "$BYTEWAX_PROCESSES" -gt 1 ]
+    then
+        # Start a local cluster of BYTEWAX_PROCESSES processes, each running BYTEWAX_WORKERS_PER_PROCESS workers.
+        addresses=""
+        i=0
+        while [ $i -lt "$BYTEWAX_PROCESSES" ]
+        do
+            addresses="${addresses:+$addresses;}localhost:$((BYTEWAX_BASE_PORT + i))"
+            i=$((i + 1))
+        done
+
+        i=0
+        while [ $i -lt "$BYTEWAX_PROCESSES" ]
+        do
+            python -m bytewax.run $BYTEWAX_PYTHON_FILE_PATH -i $i -a "$addresses" &
+            i=$((i + 1))
+        done
+        wait
+    else
+        python -m bytewax.run $BYTEWAX_PYTHON_FILE_PATH
+    fi
 fi
 
 
@@ -0,0 +1,112 @@
+import pytest
+
+text_splitter = pytest.importorskip("langchain.text_splitter")
+transformers = pytest.importorskip("transformers")
+
+from config import settings  # noqa: E402
+from utils.chunking import ChunkingEngine, get_chunking_config  # noqa: E402
+
+PARAGRAPH = (
+    "Building an LLM twin means collecting your digital footprint, cleaning it and chunking it "
+    "before embedding every chunk into a vector DB. The feature pipeline streams the documents "
+    "from the queue, so new posts are searchable a few seconds after they are written. "
+)
+
+DOCUMENTS = {
+    "posts": "\n\n".join(
+        [
+            "Excited to share the new lesson of the LLM Twin course! It covers RAG end to end.",
+            PARAGRAPH * 3,
+            "Check it out [URL] and let me know what you think.",
+        ]
+    ),
+    "articles": "\n\n".join(
+        [
+            "# An end-to-end framework for production-ready LLM systems",
+            *[f"## Lesson {i}\n" + PARAGRAPH * (i + 2) for i in range(6)],
+            # A long section without paragraph breaks, split by the token window only.
+            PARAGRAPH * 40,
+        ]
+    ),
+    "repositories": "\n\n".join(
+        [
+            "## src/feature_pipeline/main.py",
+            "import bytewax.operators as op\nfrom bytewax.dataflow import Dataflow\n\n"
+            "flow = Dataflow('Streaming ingestion pipeline')\n"
+            "stream = op.input('input', flow, RabbitMQSource())\n" * 30,
+            "## README.md\n" + PARAGRAPH * 25,
+        ]
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    try:
+        return transformers.AutoTokenizer.from_pretrained(
+            settings.EMBEDDING_MODEL_ID, use_fast=True
+        )
+    except OSError as e:
+        pytest.skip(f"The tokenizer of the embedding model couldn't be loaded: {e}")
+
+
+def chunk_with_sentence_transformers(tokenizer, text: str, data_type: str) -> list[str]:
+    """
+    The chunking ChunkingEngine replaces: RecursiveCharacterTextSplitter followed by SentenceTransformersTokenTextSplitter.
+    The token splitter is driven through split_text_on_tokens exactly as SentenceTransformersTokenTextSplitter does
+    (the model's tokenizer, without the start and stop tokens), but it is fed token positions instead of token ids,
+    so every window is mapped back to the exact span of characters it covers instead of being decoded.
+    """
+
+    config = get_chunking_config(data_type)
+    character_splitter = text_splitter.RecursiveCharacterTextSplitter(
+        separators=["\n\n"],
+        chunk_size=config.chunk_size,
+        chunk_overlap=config.chunk_overlap,
+    )
+
+    chunks = []
+    for section in character_splitter.split_text(text):
+        token_ids = tokenizer.encode(section)[1:-1]
+        encoding = tokenizer(
+            section, add_special_tokens=False, return_offsets_mapping=True
+        )
+        assert encoding["input_ids"] == token_ids
+
+        offsets = encoding["offset_mapping"]
+        windows = text_splitter.split_text_on_tokens(
+            text=section,
+            tokenizer=text_splitter.Tokenizer(
+                chunk_overlap=config.token_chunk_overlap,
+                tokens_per_chunk=config.tokens_per_chunk,
+                decode=lambda positions: (positions[0], positions[-1]),
+                encode=lambda _: list(range(len(token_ids))),
+            ),
+        )
+        chunks.extend(
+            section[offsets[first][0] : offsets[last][1]] for first, last in windows
+        )
+
+    return chunks
+
+
+@pytest.mark.parametrize("data_type", list(DOCUMENTS))
+def test_chunk_boundaries_match_sentence_transformers_splitter(
+    tokenizer, data_type: str
+) -> None:
+    document = DOCUMENTS[data_type]
+
+    expected_chunks = chunk_with_sentence_transformers(
+        tokenizer, document, data_type=data_type
+    )
+    chunks = ChunkingEngine.chunk(document, data_type=data_type)
+
+    assert chunks == expected_chunks
+
+
+def test_long_sections_are_split_on_the_token_windows(tokenizer) -> None:
+    expected_chunks = chunk_with_sentence_transformers(
+        tokenizer, DOCUMENTS["articles"], data_type="articles"
+    )
+
+    assert len(expected_chunks) > len(DOCUMENTS["articles"].split("\n\n"))
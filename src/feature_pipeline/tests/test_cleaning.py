@@ -0,0 +1,135 @@
+import re
+
+import pytest
+
+unstructured_core = pytest.importorskip("unstructured.cleaners.core")
+
+from utils.cleaning import clean_text  # noqa: E402
+
+# The regex implementations clean_text replaces, kept verbatim as the reference output.
+
+
+def unbold_text(text):
+    # Mapping of bold numbers to their regular equivalents
+    bold_numbers = {
+        "𝟬": "0",
+        "𝟭": "1",
+        "𝟮": "2",
+        "𝟯": "3",
+        "𝟰": "4",
+        "𝟱": "5",
+        "𝟲": "6",
+        "𝟳": "7",
+        "𝟴": "8",
+        "𝟵": "9",
+    }
+
+    # Function to convert bold characters (letters and numbers)
+    def convert_bold_char(match):
+        char = match.group(0)
+        # Convert bold numbers
+        if char in bold_numbers:
+            return bold_numbers[char]
+        # Convert bold uppercase letters
+        elif "\U0001d5d4" <= char <= "\U0001d5ed":
+            return chr(ord(char) - 0x1D5D4 + ord("A"))
+        # Convert bold lowercase letters
+        elif "\U0001d5ee" <= char <= "\U0001d607":
+            return chr(ord(char) - 0x1D5EE + ord("a"))
+        else:
+            return char  # Return the character unchanged if it's not a bold number or letter
+
+    # Regex for bold characters (numbers, uppercase, and lowercase letters)
+    bold_pattern = re.compile(
+        r"[\U0001D5D4-\U0001D5ED\U0001D5EE-\U0001D607\U0001D7CE-\U0001D7FF]"
+    )
+    text = bold_pattern.sub(convert_bold_char, text)
+
+    return text
+
+
+def unitalic_text(text):
+    # Function to convert italic characters (both letters)
+    def convert_italic_char(match):
+        char = match.group(0)
+        # Unicode ranges for italic characters
+        if "\U0001d608" <= char <= "\U0001d621":  # Italic uppercase A-Z
+            return chr(ord(char) - 0x1D608 + ord("A"))
+        elif "\U0001d622" <= char <= "\U0001d63b":  # Italic lowercase a-z
+            return chr(ord(char) - 0x1D622 + ord("a"))
+        else:
+            return char  # Return the character unchanged if it's not an italic letter
+
+    # Regex for italic characters (uppercase and lowercase letters)
+    italic_pattern = re.compile(r"[\U0001D608-\U0001D621\U0001D622-\U0001D63B]")
+    text = italic_pattern.sub(convert_italic_char, text)
+
+    return text
+
+
+def remove_emojis_and_symbols(text):
+    # Extended pattern to include specific symbols like ↓ (U+2193) or ↳ (U+21B3)
+    emoji_and_symbol_pattern = re.compile(
+        "["
+        "\U0001f600-\U0001f64f"  # emoticons
+        "\U0001f300-\U0001f5ff"  # symbols & pictographs
+        "\U0001f680-\U0001f6ff"  # transport & map symbols
+        "\U0001f1e0-\U0001f1ff"  # flags (iOS)
+        "\U00002193"  # downwards arrow
+        "\U000021b3"  # downwards arrow with tip rightwards
+        "\U00002192"  # rightwards arrow
+        "]+",
+        flags=re.UNICODE,
+    )
+
+    return emoji_and_symbol_pattern.sub(r" ", text)
+
+
+def replace_urls_with_placeholder(text, placeholder="[URL]"):
+    # Regular expression pattern for matching URLs
+    url_pattern = r"https?://\S+|www\.\S+"
+
+    return re.sub(url_pattern, placeholder, text)
+
+
+def clean_text_with_unstructured(text_content: str | None) -> str:
+    """The cleaning chain clean_text replaces, kept as the reference output."""
+
+    if text_content is None:
+        return ""
+
+    cleaned_text = unbold_text(text_content)
+    cleaned_text = unitalic_text(cleaned_text)
+    cleaned_text = remove_emojis_and_symbols(cleaned_text)
+    cleaned_text = unstructured_core.clean(cleaned_text)
+    cleaned_text = unstructured_core.replace_unicode_quotes(cleaned_text)
+    cleaned_text = unstructured_core.clean_non_ascii_chars(cleaned_text)
+    cleaned_text = replace_urls_with_placeholder(cleaned_text)
+
+    return cleaned_text
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        None,
+        "",
+        "   Plain ASCII text with trailing spaces.   \n",
+        # Mojibake of quotes, dashes and ellipses.
+        "Itâ\x80\x99s â\x80\x9cquotedâ\x80\x9d â\x80\x94 and moreâ\x80¦",
+        "â\x80\x98singleâ\x80\x99 and â\x80¢ bullets and â\x80\x93 dashes",
+        "Broken sequence â\x80 at the end â\x80",
+        # HTML entities and Windows-1252 quotes.
+        "Don&apos;t \x91quote\x92 \x93me\x94",
+        # URLs.
+        "Read https://decodingml.substack.com/p/llm-twin?utm=1 and www.example.com/page.",
+        "http://a.b https://c.d/e?f=g#h www.x.y",
+        # Non-ASCII text, math alphanumerics, emojis and symbols.
+        "Café naïve résumé — “smart quotes” ‘single’ … 你好",
+        "𝗕𝗼𝗹𝗱 𝘁𝗲𝘅𝘁 𝟭𝟮𝟯 and 𝘐𝘵𝘢𝘭𝘪𝘤 𝘵𝘦𝘹𝘵",
+        "🚀 Launch ↓ details ↳ more → next 🇺🇸",
+        "  ↓ 𝗟𝗟𝗠 𝗧𝘄𝗶𝗻 ↓ https://github.com/decodingml/llm-twin-course ✅ Itâ\x80\x99s live  ",
+    ],
+)
+def test_clean_text_matches_unstructured_chain(text: str | None) -> None:
+    assert clean_text(text) == clean_text_with_unstructured(text)
@@ -1,25 +1,163 @@
-from langchain.text_splitter import (
-    RecursiveCharacterTextSplitter,
-    SentenceTransformersTokenTextSplitter,
-)
+import threading
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from pydantic import BaseModel
+from transformers import AutoTokenizer
 
 from config import settings
 
 
-def chunk_text(text: str) -> list[str]:
-    character_splitter = RecursiveCharacterTextSplitter(
-        separators=["\n\n"], chunk_size=500, chunk_overlap=0
-    )
-    text_split = character_splitter.split_text(text)
+class ChunkingConfig(BaseModel):
+    chunk_size: int
+    chunk_overlap: int
+    tokens_per_chunk: int = settings.EMBEDDING_MODEL_MAX_INPUT_LENGTH
+    token_chunk_overlap: int = 50
+
+
+CHUNKING_CONFIGS = {
+    "posts": ChunkingConfig(chunk_size=250, chunk_overlap=25),
+    "articles": ChunkingConfig(chunk_size=1000, chunk_overlap=100),
+    "repositories": ChunkingConfig(chunk_size=1500, chunk_overlap=100),
+}
+
+
+class TokenTextChunker:
+    """
+    Splits texts into overlapping windows of tokens using only the (fast) tokenizer of the embedding model.
+    It produces the same windows as langchain's SentenceTransformersTokenTextSplitter, but it doesn't load the
+    sentence-transformers model and it slices the original text at the character offsets of the tokens instead of
+    decoding them.
+    """
+
+    def __init__(self, model_id: str, tokens_per_chunk: int, chunk_overlap: int) -> None:
+        if chunk_overlap >= tokens_per_chunk:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than tokens per chunk ({tokens_per_chunk})."
+            )
+
+        self._tokenizer = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+        if tokens_per_chunk > self._tokenizer.model_max_length:
+            raise ValueError(
+                f"The token limit of the model '{model_id}' is: {self._tokenizer.model_max_length}."
+                f" Argument tokens_per_chunk={tokens_per_chunk} > maximum token limit."
+            )
+
+        self.tokens_per_chunk = tokens_per_chunk
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text: str) -> list[str]:
+        return self.split_texts([text])[0]
+
+    def split_texts(self, texts: list[str]) -> list[list[str]]:
+        if len(texts) == 0:
+            return []
+
+        encodings = self._tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+
+        return [
+            self._split_on_offsets(text, offsets)
+            for text, offsets in zip(texts, encodings["offset_mapping"])
+        ]
+
+    def _split_on_offsets(self, text: str, offsets: list[tuple[int, int]]) -> list[str]:
+        chunks = []
+        num_tokens = len(offsets)
+        stride = self.tokens_per_chunk - self.chunk_overlap
+
+        start_idx = 0
+        while start_idx < num_tokens:
+            end_idx = min(start_idx + self.tokens_per_chunk, num_tokens)
+            chunks.append(text[offsets[start_idx][0] : offsets[end_idx - 1][1]])
+            if end_idx == num_tokens:
+                break
+
+            start_idx += stride
+
+        return chunks
+
+
+class ChunkingEngine:
+    """
+    Splits documents into chunks using text splitters that are built once per process.
+    Each data type is chunked with its own ChunkingConfig.
+    """
+
+    _character_splitters: dict[str, RecursiveCharacterTextSplitter] = {}
+    _token_splitters: dict[tuple[int, int], TokenTextChunker] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def chunk(cls, text: str, data_type: str) -> list[str]:
+        return cls.chunk_batch([text], data_type=data_type)[0]
+
+    @classmethod
+    def chunk_batch(cls, texts: list[str], data_type: str) -> list[list[str]]:
+        character_splitter = cls.get_character_splitter(data_type)
+        token_splitter = cls.get_token_splitter(data_type)
+
+        batch_sections = [character_splitter.split_text(text) for text in texts]
+        # Tokenize the sections of all the documents in a single batch call.
+        section_chunks = iter(
+            token_splitter.split_texts(
+                [section for sections in batch_sections for section in sections]
+            )
+        )
+
+        return [
+            [chunk for _ in sections for chunk in next(section_chunks)]
+            for sections in batch_sections
+        ]
+
+    @classmethod
+    def get_character_splitter(cls, data_type: str) -> RecursiveCharacterTextSplitter:
+        splitter = cls._character_splitters.get(data_type)
+        if splitter is None:
+            config = get_chunking_config(data_type)
+            with cls._lock:
+                splitter = cls._character_splitters.setdefault(
+                    data_type,
+                    RecursiveCharacterTextSplitter(
+                        separators=["\n\n"],
+                        chunk_size=config.chunk_size,
+                        chunk_overlap=config.chunk_overlap,
+                    ),
+                )
+
+        return splitter
+
+    @classmethod
+    def get_token_splitter(cls, data_type: str) -> TokenTextChunker:
+        config = get_chunking_config(data_type)
+        # The token splitter loads the tokenizer, so it is shared by all the data types with the same window.
+        key = (config.tokens_per_chunk, config.token_chunk_overlap)
+        splitter = cls._token_splitters.get(key)
+        if splitter is None:
+            with cls._lock:
+                splitter = cls._token_splitters.get(key)
+                if splitter is None:
+                    splitter = TokenTextChunker(
+                        model_id=settings.EMBEDDING_MODEL_ID,
+                        tokens_per_chunk=config.tokens_per_chunk,
+                        chunk_overlap=config.token_chunk_overlap,
+                    )
+                    cls._token_splitters[key] = splitter
+
+        return splitter
+
+
+def get_chunking_config(data_type: str) -> ChunkingConfig:
+    if data_type not in CHUNKING_CONFIGS:
+        raise ValueError(f"Unsupported data type: {data_type}")
 
-    token_splitter = SentenceTransformersTokenTextSplitter(
-        chunk_overlap=50,
-        tokens_per_chunk=settings.EMBEDDING_MODEL_MAX_INPUT_LENGTH,
-        model_name=settings.EMBEDDING_MODEL_ID,
-    )
-    chunks = []
+    return CHUNKING_CONFIGS[data_type]
 
-    for section in text_split:
-        chunks.extend(token_splitter.split_text(section))
 
-    return chunks
+def chunk_text(text: str, data_type: str) -> list[str]:
+    return ChunkingEngine.chunk(text, data_type=data_type)
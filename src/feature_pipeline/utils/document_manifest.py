@@ -0,0 +1,191 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from config import settings
+
+
+class ManifestEntry(BaseModel):
+    content_hash: str
+    chunk_ids: list[str]
+
+
+class DocumentManifest:
+    """
+    Local SQLite index of the documents ingested so far.
+    For every entry_id it keeps the hash of the cleaned content and the ids of the chunks written to Qdrant,
+    which is what the pipeline needs to skip unchanged documents and to know when an edited one is fully written.
+
+    A document is first staged when it is chunked, together with the chunks that still have to be written.
+    Its entry is only committed (and returned by get_many) once the vector sink marked all these chunks as
+    written, so a document whose chunks never reached Qdrant is processed again when it is replayed.
+    """
+
+    MAX_QUERY_PARAMETERS = 500
+
+    _instance: "DocumentManifest | None" = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                entry_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS staged_documents (
+                entry_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                pending_chunk_ids TEXT NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    @classmethod
+    def get_instance(cls) -> "DocumentManifest":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(path=settings.DOCUMENT_MANIFEST_PATH)
+
+        return cls._instance
+
+    def get_many(self, entry_ids: list[str]) -> dict[str, ManifestEntry]:
+        unique_entry_ids = list(dict.fromkeys(entry_ids))
+        rows = []
+        with self._lock:
+            # Stay below SQLite's limit on the number of bound parameters per query.
+            for i in range(0, len(unique_entry_ids), self.MAX_QUERY_PARAMETERS):
+                batch_entry_ids = unique_entry_ids[i : i + self.MAX_QUERY_PARAMETERS]
+                placeholders = ",".join("?" * len(batch_entry_ids))
+                rows.extend(
+                    self._connection.execute(
+                        f"SELECT entry_id, content_hash, chunk_ids FROM documents WHERE entry_id IN ({placeholders})",
+                        batch_entry_ids,
+                    ).fetchall()
+                )
+
+        return {
+            entry_id: ManifestEntry(
+                content_hash=content_hash, chunk_ids=json.loads(chunk_ids)
+            )
+            for entry_id, content_hash, chunk_ids in rows
+        }
+
+    def stage_many(
+        self,
+        entries: dict[str, ManifestEntry],
+        pending_chunk_ids: dict[str, list[str]],
+    ) -> None:
+        """Stage the new entries of the documents. The entries without pending chunks are committed right away."""
+
+        if len(entries) == 0:
+            return
+
+        committed_rows = []
+        staged_rows = []
+        for entry_id, entry in entries.items():
+            row = (entry_id, entry.content_hash, json.dumps(entry.chunk_ids))
+            entry_pending_chunk_ids = list(dict.fromkeys(pending_chunk_ids.get(entry_id, [])))
+            if entry_pending_chunk_ids:
+                staged_rows.append((*row, json.dumps(entry_pending_chunk_ids)))
+            else:
+                committed_rows.append(row)
+
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO staged_documents (entry_id, content_hash, chunk_ids, pending_chunk_ids) VALUES (?, ?, ?, ?)",
+                staged_rows,
+            )
+            self._connection.executemany(
+                "DELETE FROM staged_documents WHERE entry_id = ?",
+                [(entry_id,) for entry_id, *_ in committed_rows],
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO documents (entry_id, content_hash, chunk_ids) VALUES (?, ?, ?)",
+                committed_rows,
+            )
+            self._connection.commit()
+
+    def mark_written(
+        self, chunk_ids_by_entry_id: dict[str, list[str]]
+    ) -> dict[str, ManifestEntry]:
+        """
+        Mark chunks as written to Qdrant and commit the staged entries left without pending chunks.
+        Returns the committed entries, whose chunks are now all written.
+        """
+
+        if len(chunk_ids_by_entry_id) == 0:
+            return {}
+
+        committed_entries = {}
+        with self._lock:
+            # Lock the database for writing before reading the pending chunks, as every worker process
+            # of the pipeline updates the same staged entries.
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                for entry_id, written_chunk_ids in chunk_ids_by_entry_id.items():
+                    row = self._connection.execute(
+                        "SELECT content_hash, chunk_ids, pending_chunk_ids FROM staged_documents WHERE entry_id = ?",
+                        (entry_id,),
+                    ).fetchone()
+                    if row is None:
+                        continue
+
+                    content_hash, chunk_ids, pending_chunk_ids = row
+                    written_chunk_ids = set(written_chunk_ids)
+                    pending_chunk_ids = [
+                        chunk_id
+                        for chunk_id in json.loads(pending_chunk_ids)
+                        if chunk_id not in written_chunk_ids
+                    ]
+                    if pending_chunk_ids:
+                        self._connection.execute(
+                            "UPDATE staged_documents SET pending_chunk_ids = ? WHERE entry_id = ?",
+                            (json.dumps(pending_chunk_ids), entry_id),
+                        )
+                    else:
+                        self._connection.execute(
+                            "DELETE FROM staged_documents WHERE entry_id = ?",
+                            (entry_id,),
+                        )
+                        self._connection.execute(
+                            "INSERT OR REPLACE INTO documents (entry_id, content_hash, chunk_ids) VALUES (?, ?, ?)",
+                            (entry_id, content_hash, chunk_ids),
+                        )
+                        committed_entries[entry_id] = ManifestEntry(
+                            content_hash=content_hash, chunk_ids=json.loads(chunk_ids)
+                        )
+                self._connection.commit()
+            except Exception:
+                self._connection.rollback()
+
+                raise
+
+        return committed_entries
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def compute_content_hash(content: str) -> str:
+    return hashlib.md5(content.encode()).hexdigest()
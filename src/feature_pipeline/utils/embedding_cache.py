@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import settings
+from core import get_logger
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of chunk embeddings backed by SQLite.
+    Vectors are keyed by (embedding model id, hash of the chunk content) and evicted in least-recently-used order
+    once the cache holds more than max_entries vectors.
+
+    Reads don't write to the database: the access times of the hits are buffered in memory and
+    flushed with the next write (or once ACCESS_FLUSH_SIZE of them are pending).
+    """
+
+    MAX_QUERY_PARAMETERS = 500
+    ACCESS_FLUSH_SIZE = 10_000
+    # Evict down to this fraction of max_entries, so the table is only counted again
+    # after a large enough batch of writes.
+    EVICTION_LOW_WATERMARK = 0.9
+
+    _instance: "EmbeddingCache | None" = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model_id, chunk_id)
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+        )
+        self._connection.commit()
+
+        # Tracked in memory, so the table is only counted when the cache may be full.
+        (self._num_entries,) = self._connection.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()
+        self._pending_accesses: dict[tuple[str, str], float] = {}
+
+    @classmethod
+    def get_instance(cls) -> "EmbeddingCache":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        path=settings.EMBEDDING_CACHE_PATH,
+                        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                    )
+
+        return cls._instance
+
+    def get_many(self, model_id: str, chunk_ids: list[str]) -> dict[str, np.ndarray]:
+        unique_chunk_ids = list(dict.fromkeys(chunk_ids))
+        rows = []
+        with self._lock:
+            # Stay below SQLite's limit on the number of bound parameters per query.
+            for i in range(0, len(unique_chunk_ids), self.MAX_QUERY_PARAMETERS):
+                batch_chunk_ids = unique_chunk_ids[i : i + self.MAX_QUERY_PARAMETERS]
+                placeholders = ",".join("?" * len(batch_chunk_ids))
+                rows.extend(
+                    self._connection.execute(
+                        f"SELECT chunk_id, vector FROM embeddings WHERE model_id = ? AND chunk_id IN ({placeholders})",
+                        (model_id, *batch_chunk_ids),
+                    ).fetchall()
+                )
+            now = time.time()
+            for chunk_id, _ in rows:
+                self._pending_accesses[(model_id, chunk_id)] = now
+            if len(self._pending_accesses) >= self.ACCESS_FLUSH_SIZE:
+                self._flush_accesses()
+                self._connection.commit()
+
+            vectors = {
+                chunk_id: np.frombuffer(vector, dtype=np.float32)
+                for chunk_id, vector in rows
+            }
+            num_hits = sum(1 for chunk_id in chunk_ids if chunk_id in vectors)
+            self.hits += num_hits
+            self.misses += len(chunk_ids) - num_hits
+
+        return vectors
+
+    def put_many(self, model_id: str, vectors: dict[str, np.ndarray]) -> None:
+        if len(vectors) == 0:
+            return
+
+        now = time.time()
+        rows = [
+            (model_id, chunk_id, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for chunk_id, vector in vectors.items()
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, chunk_id, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._num_entries += len(rows)
+            self._flush_accesses()
+            if self._num_entries > self.max_entries:
+                self._evict()
+            self._connection.commit()
+
+    def _flush_accesses(self) -> None:
+        if len(self._pending_accesses) == 0:
+            return
+
+        self._connection.executemany(
+            "UPDATE embeddings SET last_access = ? WHERE model_id = ? AND chunk_id = ?",
+            [
+                (last_access, model_id, chunk_id)
+                for (model_id, chunk_id), last_access in self._pending_accesses.items()
+            ],
+        )
+        self._pending_accesses.clear()
+
+    def _evict(self) -> None:
+        # The in-memory count is approximate (replaced rows are counted twice and the rows written by
+        # other processes are missed), so the table is counted exactly before evicting.
+        (num_entries,) = self._connection.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()
+        self._num_entries = num_entries
+        if num_entries <= self.max_entries:
+            return
+
+        num_to_evict = num_entries - int(self.max_entries * self.EVICTION_LOW_WATERMARK)
+
+        self._connection.execute(
+            """
+            DELETE FROM embeddings WHERE rowid IN (
+                SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?
+            )
+            """,
+            (num_to_evict,),
+        )
+        self._num_entries -= num_to_evict
+        logger.info("Evicted embeddings from the cache.", num=num_to_evict)
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accesses()
+            self._connection.commit()
+            self._connection.close()
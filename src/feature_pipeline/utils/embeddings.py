@@ -1,16 +1,143 @@
+import hashlib
+import threading
+
+import numpy as np
 from InstructorEmbedding import INSTRUCTOR
 from sentence_transformers.SentenceTransformer import SentenceTransformer
 
 from config import settings
+from core import get_logger
+from utils.embedding_cache import EmbeddingCache
+
+logger = get_logger(__name__)
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide registry of embedding models.
+    Each model is loaded from disk once per (model id, device) pair and shared by all the workers of the process.
+    """
+
+    _models: dict[tuple[str, str, str], SentenceTransformer | INSTRUCTOR] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_sentence_transformer(
+        cls, model_id: str | None = None, device: str | None = None
+    ) -> SentenceTransformer:
+        return cls._get_or_load(
+            model_cls=SentenceTransformer,
+            model_id=model_id or settings.EMBEDDING_MODEL_ID,
+            device=device or settings.EMBEDDING_MODEL_DEVICE,
+        )
+
+    @classmethod
+    def get_instructor(
+        cls, model_id: str | None = None, device: str | None = None
+    ) -> INSTRUCTOR:
+        return cls._get_or_load(
+            model_cls=INSTRUCTOR,
+            model_id=model_id or settings.INSTRUCTOR_MODEL_ID,
+            device=device or settings.EMBEDDING_MODEL_DEVICE,
+        )
+
+    @classmethod
+    def warm_up(cls, include_instructor: bool = False) -> None:
+        """Load the models used by the dataflow before the first message arrives."""
+
+        cls.get_sentence_transformer()
+        if include_instructor:
+            cls.get_instructor()
+
+    @classmethod
+    def release(cls, model_id: str | None = None, device: str | None = None) -> None:
+        """Drop the cached models matching the given filters (all of them by default)."""
+
+        with cls._lock:
+            for key in list(cls._models.keys()):
+                _, cached_model_id, cached_device = key
+                if model_id is not None and cached_model_id != model_id:
+                    continue
+                if device is not None and cached_device != device:
+                    continue
+
+                del cls._models[key]
+                logger.info(
+                    "Released embedding model.",
+                    model_id=cached_model_id,
+                    device=cached_device,
+                )
+
+    @classmethod
+    def _get_or_load(cls, model_cls: type, model_id: str, device: str):
+        key = (model_cls.__name__, model_id, device)
+        model = cls._models.get(key)
+        if model is not None:
+            return model
+
+        with cls._lock:
+            # Another worker thread might have loaded the model while we were waiting for the lock.
+            model = cls._models.get(key)
+            if model is None:
+                logger.info("Loading embedding model.", model_id=model_id, device=device)
+                model = model_cls(model_id, device=device)
+                cls._models[key] = model
+
+        return model
 
 
 def embedd_text(text: str):
-    model = SentenceTransformer(settings.EMBEDDING_MODEL_ID)
+    model = EmbeddingModelRegistry.get_sentence_transformer()
     return model.encode(text)
 
 
+def embedd_text_batch(texts: list[str]) -> np.ndarray:
+    """Embed all the texts in a single encode call. Row i of the returned float32 matrix is the embedding of texts[i]."""
+
+    model = EmbeddingModelRegistry.get_sentence_transformer()
+    embeddings = model.encode(texts, batch_size=settings.EMBEDDING_BATCH_SIZE)
+
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def embedd_chunks(texts: list[str]) -> np.ndarray:
+    """
+    Embed a batch of chunks, reusing the vectors of the chunks embedded before.
+    The cache is keyed by (embedding model id, hash of the chunk content) and consulted before calling the model,
+    so only the chunks missing from the cache are encoded, even if they come from another document.
+    The embeddings are returned as one contiguous float32 matrix, so the models can hold views of its rows.
+    """
+
+    if len(texts) == 0:
+        return np.empty((0, settings.EMBEDDING_SIZE), dtype=np.float32)
+
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embedd_text_batch(texts)
+
+    chunk_ids = [hashlib.md5(text.encode()).hexdigest() for text in texts]
+    cache = EmbeddingCache.get_instance()
+    cached_vectors = cache.get_many(settings.EMBEDDING_MODEL_ID, chunk_ids)
+
+    missing_chunks = {
+        chunk_id: text
+        for chunk_id, text in zip(chunk_ids, texts)
+        if chunk_id not in cached_vectors
+    }
+    if missing_chunks:
+        missing_vectors = embedd_text_batch(list(missing_chunks.values()))
+        new_vectors = dict(zip(missing_chunks.keys(), missing_vectors))
+        cache.put_many(settings.EMBEDDING_MODEL_ID, new_vectors)
+        cached_vectors.update(new_vectors)
+
+    embeddings = np.empty((len(chunk_ids), settings.EMBEDDING_SIZE), dtype=np.float32)
+    for row, chunk_id in enumerate(chunk_ids):
+        embeddings[row] = cached_vectors[chunk_id]
+
+    return embeddings
+
+
 def embedd_repositories(text: str):
-    model = INSTRUCTOR("hkunlp/instructor-xl")
+    model = EmbeddingModelRegistry.get_instructor()
     sentence = text
     instruction = "Represent the structure of the repository"
     return model.encode([instruction, sentence])
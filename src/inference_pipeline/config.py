@@ -32,6 +32,21 @@ class Settings(BaseSettings):
     TOP_K: int = 5
     KEEP_TOP_K: int = 5
     EXPAND_N_QUERY: int = 5
+    RAG_HYBRID_SEARCH: bool = True  # Fuse the dense search with a BM25 sparse search.
+    RAG_FUSION_METHOD: str = "rrf"  # How duplicate hits are merged. One of: rrf, max.
+    RAG_RRF_K: int = 60
+    RAG_MAX_RERANK_CANDIDATES: int = 20  # Max number of unique hits sent to the reranker.
+
+    # RAG response cache config
+    RAG_RESPONSE_CACHE_BACKEND: str = "memory"  # One of: none, memory, disk.
+    RAG_RESPONSE_CACHE_MAX_ENTRIES: int = 10_000  # Only used by the in-memory backend.
+    RAG_RESPONSE_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    RAG_RESPONSE_CACHE_PATH: str = str(Path(ROOT_DIR) / ".cache" / "rag_responses.sqlite")
+
+    # Reranking config
+    RERANKER_BACKEND: str = "openai"  # One of: openai, cross_encoder.
+    RERANKER_CROSS_ENCODER_MODEL_ID: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANKER_BATCH_SIZE: int = 32  # Number of (query, passage) pairs scored together.
 
     # CometML config
     COMET_API_KEY: str
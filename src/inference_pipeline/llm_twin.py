@@ -1,4 +1,5 @@
 import pprint
+import threading
 
 import opik
 import sagemaker
@@ -10,16 +11,37 @@ from langchain.prompts import PromptTemplate
 from opik import opik_context
 from prompt_templates import InferenceTemplate
 from sagemaker.huggingface.model import HuggingFacePredictor
-from utils import compute_num_tokens, truncate_text_to_max_tokens
+from utils import (
+    compute_num_tokens,
+    compute_num_tokens_batch,
+    pack_context,
+    split_joined_text,
+    truncate_text_to_max_tokens,
+)
 
 logger = logger_utils.get_logger(__name__)
 
+CONTEXT_SEPARATOR = "\n\n"
+
 
 class LLMTwin:
     def __init__(self, mock: bool = False) -> None:
         self._mock = mock
         self._llm_endpoint = self.build_sagemaker_predictor()
         self.prompt_template_builder = InferenceTemplate()
+        self._retriever: VectorRetriever | None = None
+        self._retriever_lock = threading.Lock()
+
+    @property
+    def retriever(self) -> VectorRetriever:
+        # Built on the first RAG request and shared by the next ones, as it loads the embedding model and
+        # opens the DB clients, which requests without RAG don't need.
+        if self._retriever is None:
+            with self._retriever_lock:
+                if self._retriever is None:
+                    self._retriever = VectorRetriever()
+
+        return self._retriever
 
     def build_sagemaker_predictor(self) -> HuggingFacePredictor:
         return HuggingFacePredictor(
@@ -40,18 +62,20 @@ class LLMTwin:
         prompt_template_variables = {"question": query}
 
         if enable_rag is True:
-            retriever = VectorRetriever(query=query)
-            hits = retriever.retrieve_top_k(
-                k=settings.TOP_K, to_expand_to_n_queries=settings.EXPAND_N_QUERY
+            hits = self.retriever.retrieve_top_k(
+                query=query,
+                k=settings.TOP_K,
+                to_expand_to_n_queries=settings.EXPAND_N_QUERY,
+            )
+            prompt_template_variables["context"] = self.retriever.rerank(
+                query=query, hits=hits, keep_top_k=settings.KEEP_TOP_K
             )
-            context = retriever.rerank(hits=hits, keep_top_k=settings.KEEP_TOP_K)
-            prompt_template_variables["context"] = context
-        else:
-            context = None
 
-        messages, input_num_tokens = self.format_prompt(
+        messages, input_num_tokens, context = self.format_prompt(
             system_prompt, prompt_template, prompt_template_variables
         )
+        if context is not None:
+            prompt_template_variables["context"] = context
 
         logger.debug(f"Prompt: {pprint.pformat(messages)}")
         answer = self.call_llm_service(messages=messages)
@@ -86,13 +110,66 @@ class LLMTwin:
         system_prompt,
         prompt_template: PromptTemplate,
         prompt_template_variables: dict,
-    ) -> tuple[list[dict[str, str]], int]:
-        prompt = prompt_template.format(**prompt_template_variables)
-
-        num_system_prompt_tokens = compute_num_tokens(system_prompt)
-        prompt, prompt_num_tokens = truncate_text_to_max_tokens(
-            prompt, max_tokens=settings.MAX_INPUT_TOKENS - num_system_prompt_tokens
+    ) -> tuple[list[dict[str, str]], int, list[str] | None]:
+        """
+        Render the prompt within MAX_INPUT_TOKENS. Returns the messages, their number of tokens and the passages
+        of the context that made it into the prompt (None without RAG).
+        """
+
+        prompt_template_variables = dict(prompt_template_variables)
+        passages = prompt_template_variables.pop("context", None)
+        if passages is not None:
+            prompt_template_variables["context"] = ""
+
+        # Count the fixed part of the prompt once: the system prompt, the template and the question.
+        question_prompt = prompt_template.format(**prompt_template_variables)
+        num_system_prompt_tokens, num_question_prompt_tokens = compute_num_tokens_batch(
+            [system_prompt, question_prompt]
         )
+        max_prompt_tokens = settings.MAX_INPUT_TOKENS - num_system_prompt_tokens
+
+        if num_question_prompt_tokens >= max_prompt_tokens:
+            # The question alone fills the budget, so it is truncated and the context is left out.
+            prompt, prompt_num_tokens = truncate_text_to_max_tokens(
+                question_prompt, max_tokens=max_prompt_tokens
+            )
+            packed_passages = [] if passages is not None else None
+        elif passages:
+            # Fill the rest of the budget with the passages in their rerank order.
+            packed_passages, num_context_tokens = pack_context(
+                passages,
+                max_tokens=max_prompt_tokens - num_question_prompt_tokens,
+                separator=CONTEXT_SEPARATOR,
+            )
+            logger.info(
+                "Context packed.",
+                num_passages=len(passages),
+                num_packed_passages=len(packed_passages),
+                num_context_tokens=num_context_tokens,
+            )
+
+            context = CONTEXT_SEPARATOR.join(packed_passages)
+            prompt_template_variables["context"] = context
+            prompt = prompt_template.format(**prompt_template_variables)
+            # The packed token count is an estimate, so the rendered prompt is counted once, by truncating it
+            # to the budget. In the rare case it doesn't fit, only the end of the context is cut, as the
+            # context closes the template.
+            truncated_prompt, prompt_num_tokens = truncate_text_to_max_tokens(
+                prompt, max_tokens=max_prompt_tokens
+            )
+            if len(truncated_prompt) < len(prompt):
+                logger.warning(
+                    "Packed context over budget, truncating it.",
+                    max_tokens=max_prompt_tokens,
+                )
+                kept_context = truncated_prompt[prompt.rindex(context) :]
+                packed_passages = split_joined_text(
+                    kept_context, packed_passages, separator=CONTEXT_SEPARATOR
+                )
+                prompt = truncated_prompt
+        else:
+            prompt, prompt_num_tokens = question_prompt, num_question_prompt_tokens
+            packed_passages = passages
         total_input_tokens = num_system_prompt_tokens + prompt_num_tokens
 
         messages = [
@@ -100,7 +177,7 @@ class LLMTwin:
             {"role": "user", "content": prompt},
         ]
 
-        return messages, total_input_tokens
+        return messages, total_input_tokens, packed_passages
 
     @opik.track(name="inference_pipeline.call_llm_service")
     def call_llm_service(self, messages: list[dict[str, str]]) -> str:
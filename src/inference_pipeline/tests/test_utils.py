@@ -0,0 +1,130 @@
+import pytest
+
+pytest.importorskip("transformers")
+
+from utils import (  # noqa: E402
+    get_tokenizer,
+    pack_context,
+    split_joined_text,
+    truncate_text_to_max_tokens,
+)
+
+TEXT = (
+    "The feature pipeline cleans, chunks and embeds every document.\n"
+    "The chunks are written to Qdrant (one collection per data type.)\n\n"
+    "The inference pipeline retrieves the most relevant chunks.\n\n"
+    "They are reranked and packed into the prompt of the LLM twin. "
+) * 10
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    try:
+        return get_tokenizer()
+    except OSError as e:
+        pytest.skip(f"The tokenizer of the model couldn't be loaded: {e}")
+
+
+def count_tokens(tokenizer, text: str) -> int:
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def test_text_within_the_limit_is_not_truncated(tokenizer) -> None:
+    num_tokens = count_tokens(tokenizer, TEXT)
+
+    assert truncate_text_to_max_tokens(TEXT, max_tokens=num_tokens) == (
+        TEXT,
+        num_tokens,
+    )
+
+
+@pytest.mark.parametrize("max_tokens", [1, 7, 13, 25, 50, 101, 200])
+def test_truncated_token_count_matches_the_tokenizer(tokenizer, max_tokens: int) -> None:
+    truncated_text, num_tokens = truncate_text_to_max_tokens(TEXT, max_tokens=max_tokens)
+
+    assert TEXT.startswith(truncated_text)
+    assert num_tokens <= max_tokens
+    assert num_tokens == count_tokens(tokenizer, truncated_text)
+
+
+@pytest.mark.parametrize("sentence_end", [".\n", ".\n\n", ".)", ". "])
+def test_cut_inside_a_token_is_counted(tokenizer, sentence_end: str) -> None:
+    # The "." the text is cut at can share its token with the characters that follow it.
+    text = f"First sentence{sentence_end}" + "second sentence without a period " * 10
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)[
+        "offset_mapping"
+    ]
+    period_position = text.index(".")
+    period_token = next(
+        index for index, (_, end) in enumerate(offsets) if end > period_position
+    )
+
+    truncated_text, num_tokens = truncate_text_to_max_tokens(
+        text, max_tokens=period_token + 2
+    )
+
+    assert truncated_text == "First sentence."
+    assert num_tokens == period_token + 1
+    assert num_tokens >= count_tokens(tokenizer, truncated_text)
+
+
+PASSAGES = [
+    "Qdrant stores the embedded chunks of the posts, articles and repositories.",
+    "The cleaned documents are chunked on the tokens of the embedding model. " * 20,
+    "The reranker keeps the most relevant chunks.",
+    "The LLM twin answers in the voice of its author.",
+]
+
+
+def test_pack_context_keeps_every_passage_that_fits(tokenizer) -> None:
+    packed_passages, num_tokens = pack_context(PASSAGES, max_tokens=10_000)
+
+    assert packed_passages == PASSAGES
+    assert count_tokens(tokenizer, "\n\n".join(packed_passages)) <= num_tokens
+
+
+def test_pack_context_skips_the_passages_over_budget(tokenizer) -> None:
+    # Room for all the passages but the long one, which is skipped in favour of the next ones.
+    short_passages = [PASSAGES[0], *PASSAGES[2:]]
+    max_tokens = count_tokens(tokenizer, "\n\n".join(short_passages)) + 2 * len(PASSAGES)
+
+    packed_passages, num_tokens = pack_context(PASSAGES, max_tokens=max_tokens)
+
+    assert packed_passages == short_passages
+    assert num_tokens <= max_tokens
+    assert count_tokens(tokenizer, "\n\n".join(packed_passages)) <= num_tokens
+
+
+def test_pack_context_truncates_the_first_passage_if_none_fits(tokenizer) -> None:
+    passages = [PASSAGES[1], PASSAGES[1]]
+    max_tokens = count_tokens(tokenizer, PASSAGES[1]) // 2
+
+    packed_passages, num_tokens = pack_context(passages, max_tokens=max_tokens)
+
+    assert len(packed_passages) == 1
+    assert PASSAGES[1].startswith(packed_passages[0])
+    assert packed_passages[0].endswith(".")
+    assert num_tokens <= max_tokens
+    assert count_tokens(tokenizer, packed_passages[0]) <= num_tokens
+
+
+def test_pack_context_without_budget_is_empty(tokenizer) -> None:
+    assert pack_context(PASSAGES, max_tokens=0) == ([], 0)
+    assert pack_context([], max_tokens=100) == ([], 0)
+
+
+@pytest.mark.parametrize(
+    "num_chars, expected_parts",
+    [
+        (None, PASSAGES),
+        (len(PASSAGES[0]) + 1, PASSAGES[:1]),
+        (len(PASSAGES[0]) + 2 + 10, [PASSAGES[0], PASSAGES[1][:10]]),
+        (0, []),
+    ],
+)
+def test_split_joined_text_keeps_the_parts_of_the_prefix(
+    num_chars: int | None, expected_parts: list[str]
+) -> None:
+    text = "\n\n".join(PASSAGES)[:num_chars]
+
+    assert split_joined_text(text, PASSAGES, separator="\n\n") == expected_parts
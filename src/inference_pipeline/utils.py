@@ -1,16 +1,42 @@
+from functools import lru_cache
+
 from config import settings
-from transformers import AutoTokenizer
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer() -> PreTrainedTokenizerBase:
+    """Load the tokenizer of the model once per process, as loading it takes hundreds of milliseconds."""
+
+    return AutoTokenizer.from_pretrained(settings.MODEL_ID, use_fast=True)
 
 
 def compute_num_tokens(text: str) -> int:
-    tokenizer = AutoTokenizer.from_pretrained(settings.MODEL_ID)
+    return compute_num_tokens_batch([text])[0]
 
-    return len(tokenizer.encode(text, add_special_tokens=False))
+
+def compute_num_tokens_batch(texts: list[str]) -> list[int]:
+    if len(texts) == 0:
+        return []
+
+    tokenizer = get_tokenizer()
+    encodings = tokenizer(
+        texts,
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False,
+    )
+
+    return [len(input_ids) for input_ids in encodings["input_ids"]]
 
 
 def truncate_text_to_max_tokens(text: str, max_tokens: int) -> tuple[str, int]:
     """Truncates text to not exceed max_tokens while trying to preserve complete sentences.
 
+    The text is encoded a single time: the character offsets of the tokens give the cut position,
+    so the truncated text is neither decoded nor re-encoded.
+
     Args:
         text: The text to truncate
         max_tokens: Maximum number of tokens allowed
@@ -19,23 +45,109 @@ def truncate_text_to_max_tokens(text: str, max_tokens: int) -> tuple[str, int]:
         Truncated text that fits within max_tokens and the number of tokens in the truncated text.
     """
 
-    current_tokens = compute_num_tokens(text)
+    tokenizer = get_tokenizer()
+    encoding = tokenizer(
+        text,
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        return_offsets_mapping=True,
+        verbose=False,
+    )
+    offsets = encoding["offset_mapping"]
 
-    if current_tokens <= max_tokens:
-        return text, current_tokens
+    if len(offsets) <= max_tokens:
+        return text, len(offsets)
 
-    tokenizer = AutoTokenizer.from_pretrained(settings.MODEL_ID)
-    tokens = tokenizer.encode(text, add_special_tokens=False)
+    if max_tokens <= 0:
+        return "", 0
 
-    # Take first max_tokens tokens and decode
-    truncated_tokens = tokens[:max_tokens]
-    truncated_text = tokenizer.decode(truncated_tokens)
+    # Take the first max_tokens tokens
+    truncated_text = text[: offsets[max_tokens - 1][1]]
 
     # Try to end at last complete sentence
     last_period = truncated_text.rfind(".")
     if last_period > 0:
         truncated_text = truncated_text[: last_period + 1]
 
-    truncated_tokens = compute_num_tokens(truncated_text)
+    # The tokens starting before the cut position are the tokens of the truncated text. A token that is only
+    # partly kept (e.g. ".\n" cut after the ".") still counts, so the count never underestimates the text.
+    truncated_tokens = sum(
+        1 for start, _ in offsets[:max_tokens] if start < len(truncated_text)
+    )
 
     return truncated_text, truncated_tokens
+
+
+def pack_context(
+    passages: list[str],
+    max_tokens: int,
+    separator: str = "\n\n",
+    join_margin_tokens: int = 1,
+) -> tuple[list[str], int]:
+    """Selects the passages to put in the prompt, without exceeding max_tokens.
+
+    The passages are counted once, in a single batch, and added greedily in their rerank order:
+    a passage that doesn't fit in the remaining budget is skipped, so smaller passages ranked after
+    it can still be used. If no passage fits, the first one is truncated to the budget.
+
+    Token counts don't add up exactly across a concatenation, as the tokens at the edges of the parts
+    can merge differently. join_margin_tokens are reserved at every edge (between the passages and
+    at both ends of the context) to absorb the difference.
+
+    Args:
+        passages: The passages, sorted from the most to the least relevant
+        max_tokens: Maximum number of tokens allowed for the passages and their separators
+        separator: The text joining the passages in the prompt
+        join_margin_tokens: Number of tokens reserved at every edge of the passages
+
+    Returns:
+        The selected passages, in rerank order, and the estimated number of tokens they use once joined
+        (margins included).
+    """
+
+    if len(passages) == 0 or max_tokens <= 0:
+        return [], 0
+
+    separator_tokens, *passage_tokens = compute_num_tokens_batch(
+        [separator, *passages]
+    )
+
+    # One margin for the edge before the first passage, then one more after every passage.
+    packed_passages = []
+    packed_tokens = join_margin_tokens
+    for passage, num_tokens in zip(passages, passage_tokens):
+        num_tokens += join_margin_tokens
+        if len(packed_passages) > 0:
+            num_tokens += separator_tokens
+
+        if packed_tokens + num_tokens <= max_tokens:
+            packed_passages.append(passage)
+            packed_tokens += num_tokens
+
+    if len(packed_passages) == 0:
+        truncated_passage, num_tokens = truncate_text_to_max_tokens(
+            passages[0], max_tokens=max_tokens - 2 * join_margin_tokens
+        )
+        if len(truncated_passage) == 0:
+            return [], 0
+
+        packed_passages.append(truncated_passage)
+        packed_tokens = num_tokens + 2 * join_margin_tokens
+
+    return packed_passages, packed_tokens
+
+
+def split_joined_text(text: str, parts: list[str], separator: str = "\n\n") -> list[str]:
+    """Splits a prefix of separator.join(parts) back into the parts it holds, the last one possibly cut."""
+
+    kept_parts = []
+    start = 0
+    for part in parts:
+        if start >= len(text):
+            break
+
+        kept_parts.append(text[start : start + len(part)])
+        start += len(part) + len(separator)
+
+    return kept_parts